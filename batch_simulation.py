@@ -0,0 +1,205 @@
+'''Steps many landers at once, each quantity held as one numpy array with an
+entry per craft, for autopilot tuning and difficulty analysis.'''
+import os
+import time
+import numpy as np
+from spacecraft import Spacecraft
+from terrain import Terrain
+from simulation import INPUT_KEYS
+
+
+# input bits, same layout as simulation.INPUT_KEYS
+UP, LEFT, RIGHT = (1 << i for i in range(len(INPUT_KEYS)))
+
+
+class BatchSimulation():
+    '''n craft flying over the same terrain, driven by an input bitmask per
+    craft each physics step
+
+    positions are world coordinates, the screen scrolling the game does
+    isn't needed when nothing is drawn. The craft's lowest point is what
+    touches down, rather than its whole outline as in the game'''
+
+    def __init__(self, craft_folder, map_folder, n, craft_name="eagle", seed=None, max_chunks=64):
+
+        craft = Spacecraft(craft_folder, None, audio=False)
+        if craft_name != craft.craft_name:
+            craft.set_craft(craft_name)
+
+        # constants from the craft json and Spacecraft
+        self.thrust = craft.thrust
+        self.turn_rate = craft.change_angle
+        self.fuel_rate = craft.fuel_rate
+        self.total_fuel = craft.total_fuel
+        self.pad_height = craft.pad_height
+        self.gravity = np.array(craft.gravity_vector, dtype=np.float64)
+        self.start_velocity = craft.start_velocity
+        self.start_pos = craft.start_pos
+
+        self.lowest = self.lowest_points(craft)
+
+        # craft spread out, so keep more chunks than the game needs
+        self.terrain = Terrain(map_folder, max_chunks)
+
+        self.n = n
+        self.reset(seed)
+
+    def lowest_points(self, craft) -> np.ndarray:
+        "returns the craft's lowest point relative to its centre for every whole degree"
+
+        lowest = np.empty((360, 2), dtype=np.float64)
+
+        for angle in range(360):
+            image, outline, point = craft.rotated(
+                ("base", 0), craft.craft_base, angle)
+            width, height = image.get_size()
+
+            lowest[angle] = (point[0] - width//2, point[1] - height//2)
+
+        return lowest
+
+    def reset(self, seed=None):
+        "starts every craft on a new flight, returns the seed"
+
+        n = self.n
+        self.seed = self.terrain.set_seed(seed)
+        self.steps = 0
+
+        self.x = np.full(n, self.start_pos[0], dtype=np.float64)
+        self.y = np.full(n, self.start_pos[1], dtype=np.float64)
+        self.vx = np.full(n, self.start_velocity[0], dtype=np.float64)
+        self.vy = np.full(n, self.start_velocity[1], dtype=np.float64)
+        self.angle = np.zeros(n, dtype=np.float64)
+        self.fuel = np.full(n, self.total_fuel, dtype=np.float64)
+        self.thrust_x = np.zeros(n, dtype=np.float64)
+        self.thrust_y = np.zeros(n, dtype=np.float64)
+
+        self.alive = np.ones(n, dtype=bool)
+        self.crash_step = np.full(n, -1, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.already_landed = [set() for i in range(n)]
+
+        return self.seed
+
+    def step(self, bits=0):
+        '''runs one physics step for every craft still flying, bits is an
+        input bitmask for all craft or an array with one per craft'''
+
+        bits = np.broadcast_to(np.asarray(bits, dtype=np.int64), (self.n,))
+        alive = self.alive
+
+        # control, as Spacecraft.control
+        up = alive & (bits & UP != 0) & (self.fuel >= 0)
+        radians = np.radians(self.angle)
+
+        self.thrust_x = np.where(up, -np.sin(radians)*self.thrust, 0)
+        self.thrust_y = np.where(up, -np.cos(radians)*self.thrust, 0)
+        self.fuel -= np.where(up, self.fuel_rate, 0)
+
+        self.angle += np.where(alive & (bits & LEFT != 0), self.turn_rate, 0)
+        self.angle -= np.where(alive & (bits & RIGHT != 0), self.turn_rate, 0)
+
+        # update, as Spacecraft.update
+        self.angle[self.angle >= 360] = 0
+        self.angle[self.angle < 0] = 360
+
+        self.x += np.where(alive, self.vx, 0)
+        self.y += np.where(alive, self.vy, 0)
+        self.vx += np.where(alive, self.gravity[0] + self.thrust_x, 0)
+        self.vy += np.where(alive, self.gravity[1] + self.thrust_y, 0)
+
+        self.collision_detection()
+        self.steps += 1
+
+    def collision_detection(self):
+        "crashes or lands every craft whose lowest point has reached the ground"
+
+        flying = np.flatnonzero(self.alive)
+        if len(flying) == 0:
+            return
+
+        lowest = self.lowest[np.rint(self.angle[flying]).astype(np.int64) % 360]
+        low_x = self.x[flying] + lowest[:, 0]
+        low_y = self.y[flying] + lowest[:, 1]
+
+        touching = low_y >= self.terrain.heights_at(low_x)
+
+        # few craft touch down on any one step, so these go one at a time
+        for i, x in zip(flying[touching].tolist(), low_x[touching].tolist()):
+            pad = self.terrain.get_pad(int(x))
+
+            if pad is None:
+                self.alive[i] = False
+                self.crash_step[i] = self.steps
+                continue
+
+            self.x[i] = (pad[0]+pad[1])/2
+            self.y[i] = pad[2] - self.pad_height
+            self.vx[i] = self.vy[i] = self.angle[i] = 0
+
+            if pad[0] not in self.already_landed[i]:
+                self.already_landed[i].add(pad[0])
+                self.fuel[i] += 100
+                self.score[i] += 10
+
+    def run(self, inputs):
+        '''steps through inputs, one bitmask or array of bitmasks per step,
+        until they run out or every craft has crashed'''
+
+        for bits in inputs:
+            if not self.alive.any():
+                break
+
+            self.step(bits)
+
+        return self.result()
+
+    def result(self) -> dict:
+        "returns arrays summarising every craft's flight so far"
+
+        return {
+            "seed": self.seed,
+            "steps": self.steps,
+            "alive": self.alive.copy(),
+            "crash_step": self.crash_step.copy(),
+            "score": self.score.copy(),
+            "fuel": self.fuel.copy(),
+            "x": self.x.copy(),
+            "y": self.y.copy(),
+        }
+
+
+def random_inputs(steps, n, hold=50, rng=None):
+    "returns a (steps, n) array of random input bitmasks, each held for hold steps"
+
+    rng = rng or np.random.default_rng()
+    held = rng.integers(0, 1 << len(INPUT_KEYS), size=(-(-steps // hold), n))
+
+    return held.repeat(hold, axis=0)[:steps]
+
+
+def benchmark(simulation, steps=2000, seed=1):
+    "prints craft-steps per second for a batch of random flights"
+
+    rng = np.random.default_rng(seed)
+    inputs = random_inputs(steps, simulation.n, rng=rng)
+
+    simulation.reset(seed)
+
+    start = time.perf_counter()
+    result = simulation.run(inputs)
+    elapsed = time.perf_counter() - start
+
+    craft_steps = int(np.where(result["alive"], result["steps"],
+                               result["crash_step"] + 1).sum())
+    print(f"{simulation.n} craft, {craft_steps} craft-steps in {elapsed:.2f} s, "
+          f"{craft_steps / elapsed:.0f} craft-steps/s, "
+          f"{int(result['alive'].sum())} still flying")
+
+
+if __name__ == "__main__":
+
+    for n in (1, 100, 1000, 10000):
+        simulation = BatchSimulation(os.path.join('data', 'spacecraft'),
+                                     os.path.join("data", "maps"), n)
+        benchmark(simulation)
@@ -1,264 +1,30 @@
+import time
+START_TIME = time.perf_counter()  # for the startup benchmark
+
 import os
-import math
+import sys
 import json
 import pygame
 from pygame.locals import (
     RLEACCEL,
-    K_UP,
     K_DOWN,
-    K_LEFT,
-    K_RIGHT,
     K_ESCAPE,
     KEYDOWN,
     KEYUP,
     K_0,
+    K_8,
     K_9,
     K_SPACE,
     K_RETURN,
-    QUIT,
-    MOUSEBUTTONUP
+    QUIT
 )
-from pygame.math import Vector2
 from terrain import Terrain
+from spacecraft import Spacecraft, preload_crafts
+from simulation import physics_step, input_bits, ScriptedKeys
+from recording import Recording
+from profiler import FrameProfiler, ProfileCapture
 from utils import *
-import time
-
-
-class Spacecraft(pygame.sprite.Sprite):
-    '''Controls spacecraft'''
-
-    def __init__(self, craft_folder: str, sound_folder: str, start_velocity: tuple = (0, 0.05), pos=(200, 50)):
-
-        super().__init__()
-
-        self.craft_folder = craft_folder
-        self.sound_folder = sound_folder
-
-        self.craft_name = ""
-
-        self.start_velocity = start_velocity
-        self.start_pos = pos
-
-        self.velocity_vector = Vector2(start_velocity)
-        self.thrust_vector = Vector2()
-        self.acceleration_vector = Vector2()
-        self.gravity_vector = Vector2(0, 0.0004)
-
-        # define spacecraft constants
-        self.thrust = 0
-        self.change_angle = 0
-        self.fuel = 0
-        self.fuel_rate = 0
-
-        # animation variables
-        self.is_flickering = False
-        self.current_sprite = 0
-        self.engine = False
-
-        # initial setup
-        self.angle = 0
-        self.craft_name = "eagle"  # set starter spacecraft
-        self.set_craft(self.craft_name)
-
-        pygame.mixer.music.load(self.sound_folder + "\\engine_sound.wav")
-        pygame.mixer.music.play(-1)
-        pygame.mixer.music.pause()
-
-    def reset_pos(self):
-
-        self.velocity_vector = Vector2(self.start_velocity)
-        self.angle = 0
-        self.fuel = self.total_fuel
-        self.already_landed = []
-        self.score = 0
-
-        self.pos = Vector2(self.start_pos)
-
-    def set_craft(self, craft_name, pos=(200, 50)):
-        '''Loads spacecraft from folder'''
-        # global craft_img_folder
-        # global craft_data_folder
-
-        self.craft_name = craft_name
-        self.craft_data_path = os.path.join(craft_data_folder, self.craft_name)
-
-        with open(self.craft_data_path+r'\{}.json'.format(craft_name), 'r') as f:
-            data = json.load(f)
-
-            self.change_angle = float(data['turn_rate'])
-            self.thrust = float(data["thrust"])
-            self.resize = data["resize"]
-            self.fuel = data["fuel"]
-            self.total_fuel = data["fuel"]
-            self.fuel_rate = data["fuel_rate"]
-            self.pad_height = data["pad_height"]
-
-            self.craft_base = pygame.image.load(
-                self.craft_data_path + '\\' + data["craft"])
-            self.craft_base = resize_image(
-                self.craft_base, self.resize)
-
-            self.craft_base.set_colorkey((255, 255, 255))
-
-            self.warm = []  # for throttling up or down
-            self.flicker = []  # for constant power flicker
-
-        for image in data["warm_up"]:
-            self.warm.append(
-                resize_image(
-                    pygame.image.load(self.craft_data_path +
-                                      '\\' + image), self.resize)
-            )
-
-        for image in data["flicker"]:
-            self.flicker.append(
-                resize_image(pygame.image.load(
-                    self.craft_data_path + '\\' + image), self.resize)
-            )
-
-        self.craft = self.craft_base
-        self.image = self.craft
-        self.rect = self.image.get_rect()
-        self.pos = Vector2(pos)
-
-    def get_craft(self) -> str:
-        '''Returns currently loaded craft'''
-        return self.craft
-
-    def control(self, key):
-        "handle player input"
-
-        self.thrust_vector = Vector2(0, 0)  # reset thrust vector each loop
-        self.engine = False  # flag for animation
-
-        if key[K_UP]:
-
-            if self.fuel >= 0:
-
-                horizontal_acc = - \
-                    (math.sin(math.radians(self.angle))*self.thrust)
-                vertical_acc = - \
-                    (math.cos(math.radians(self.angle))*self.thrust)
-
-                self.thrust_vector = Vector2(horizontal_acc,
-                                             vertical_acc)
-                self.engine = True
-
-                self.fuel += -self.fuel_rate
-
-        if key[K_LEFT]:
-            self.angle += self.change_angle
-
-        if key[K_RIGHT]:
-            self.angle += -self.change_angle
-
-        return self.velocity_vector, int(self.fuel), self.pos[1]
-
-    def update(self):
-        "update sprite location"
-
-        self.rot_update()
-
-        self.pos += self.velocity_vector
-        self.acceleration_vector = self.gravity_vector + self.thrust_vector
-        self.velocity_vector += self.acceleration_vector
-        self.rect.center = self.pos  # air resistance
-
-        self.animate_engine()
-
-    def rot_update(self):
-        "rotate the sprite about it's center, updates image attribute to currently selected craft"
-        self.image = pygame.transform.rotozoom(self.craft, self.angle, 1)
-        self.rect = self.image.get_rect(center=self.rect.center)
-
-        if self.angle >= 360:
-            self.angle = 0
-
-        if self.angle < 0:
-            self.angle = 360
-
-    def animate_engine(self):
-        "animates engine if engine variable is true"
-        if self.engine == True:
-
-            pygame.mixer.music.unpause()
-
-            if self.is_flickering == True:
-                if self.current_sprite >= len(self.flicker):
-                    self.current_sprite = 0
-
-                self.craft = self.flicker[int(self.current_sprite)]
-                self.current_sprite += 0.1
-
-            elif self.is_flickering == False:
-
-                if self.current_sprite >= len(self.warm):
-                    self.current_sprite = 0
-                    self.is_flickering = True
-
-                else:
-                    self.craft = self.warm[int(self.current_sprite)]
-                    self.current_sprite += 0.2
-
-        else:
-            self.current_sprite = 0
-            self.is_flickering = False
-            self.craft = self.craft_base
-
-            pygame.mixer.music.pause()
-
-    def get_image_size(self):
-        return self.rect.width, self.rect.height
-
-    def collision_detection(self):
-
-        mask = pygame.mask.from_surface(self.image)
-        center = self.rect.topleft
-
-        outline = [(p[0] + center[0], p[1] + center[1])
-                   for p in mask.outline(every=5)]
-
-        lowest_coord = [0, 0]
-
-        for coord in outline:
-            if coord[1] > lowest_coord[1]:
-                lowest_coord = coord
-
-        terrain_y = int(terrain.get_terrain_y(
-            lowest_coord[0], game_state.screen_l_x))
-
-        # pygame.draw.lines(screen, (255, 0, 255), False, outline, 5)
-        # pygame.draw.line(screen, (255, 0, 255), [0, lowest_coord[1]], [
-        #   1000, lowest_coord[1]], 2)
-        # pygame.draw.line(screen, (255, 0, 255), [0, terrain_y], [
-        # 1000, terrain_y], 2)
-
-        if lowest_coord[1] >= terrain_y:
-            pad = terrain.get_pad_number(
-                lowest_coord[0], game_state.screen_l_x)
-            if pad == False:
-                # crashed
-                print("crashed")
-                game_state.state = "crashed"
-
-            if pad != False:
-
-                if self.velocity_vector[1] < 100000:
-                    coords = terrain.pad_position(
-                        pad, game_state.screen_l_x)
-
-                    self.pos = Vector2(
-                        coords[0], coords[1] - spacecraft.pad_height)
-                    self.velocity_vector = Vector2(0, 0)
-                    self.angle = 0
-
-                    if pad not in self.already_landed:
-                        self.already_landed.append(pad)
-                        self.fuel += 100
-                        self.score += 10
-
-                else:
-                    game_state.state = "crashed"
+from concurrent.futures import ThreadPoolExecutor
 
 
 class User:
@@ -360,53 +126,63 @@ class Menu:
         self.spacecraft_path = spacecraft_path
         self.surf = surface
 
-        self.play = Button(200, 150, self.path +
-                           "\\play.png", self.path + "\\play_hover.png", 0.5)
-        self.quit_game = Button(400, 450, self.path +
-                                "\\quit.png", self.path + "\\quit_hover.png", 0.5)
-        self.shop = Button(600, 150, self.path+"\\shop.png",
-                           self.path+"\\shop_hover.png", 0.5)
-        self.stats = Button(200, 300, self.path +
-                            "\\stats.png", self.path+"\\stats_hover.png", 0.5)
-        self.login = Button(600, 300, self.path +
-                            "\\login.png", self.path+"\\login_hover.png", 0.5)
+        # buttons are only made the first time a screen uses them, see __getattr__
+        self.buttons = {
+            "play": (200, 150, self.path + "\\play.png", self.path + "\\play_hover.png", 0.5),
+            "quit_game": (400, 450, self.path + "\\quit.png", self.path + "\\quit_hover.png", 0.5),
+            "shop": (600, 150, self.path+"\\shop.png", self.path+"\\shop_hover.png", 0.5),
+            "stats": (200, 300, self.path + "\\stats.png", self.path+"\\stats_hover.png", 0.5),
+            "login": (600, 300, self.path + "\\login.png", self.path+"\\login_hover.png", 0.5),
+            "resume": (400, 100, self.path + "\\resume.png", self.path + "\\resume_hover.png", 0.5),
+            "quit_to_menu": (400, 500, self.path + "\\menu.png", self.path + "\\menu_hover.png", 0.5),
+            "help_b": (700, 600, self.path + "\\help.png", self.path + "\\help_hover.png", 0.5),
+
+            # shop buttons
+            "eagle_icon": (200, 100, self.spacecraft_path + "\\eagle\\eagle.png",
+                           self.spacecraft_path + "\\eagle\\eagle_thrust2.png", 3),
+            "defiant_icon": (510, 80, self.spacecraft_path + "\\defiant\\defiant.png",
+                             self.spacecraft_path + "\\defiant\\defiant_warming2.png", 0.3),
+        }
 
         self.login_input = InputBox(375, 200, 140, 32)
 
-        self.resume = Button(400, 100, self.path +
-                             "\\resume.png", self.path + "\\resume_hover.png", 0.5)
-        self.quit_to_menu = Button(
-            400, 500, self.path + "\\menu.png", self.path + "\\menu_hover.png", 0.5)
+        self.login_output_text = ""
 
-        self.help_b = Button(700, 600, self.path + "\\help.png",
-                             self.path + "\\help_hover.png", 0.5)
+        self.preloader = ThreadPoolExecutor(max_workers=1)
 
-        self.ready_to_click = True
+    def __getattr__(self, name):
+        "makes a button the first time it is used"
 
-        self.login_output_text = ""
+        # only called when name isn't already an attribute
+        buttons = self.__dict__.get("buttons", {})
+        if name not in buttons:
+            raise AttributeError(name)
+
+        button = Button(*buttons[name])
+        setattr(self, name, button)
 
-        # shop buttons
+        return button
 
-        self.eagle_icon = Button(
-            200, 100, self.spacecraft_path + "\\eagle\\eagle.png", self.spacecraft_path + "\\eagle\\eagle_thrust2.png", 3)
+    def preload(self):
+        '''starts loading images of buttons that haven't been made yet in the
+        background, so screens not shown yet open without loading from disk'''
 
-        self.defiant_icon = Button(
-            510, 80, self.spacecraft_path + "\\defiant\\defiant.png", self.spacecraft_path + "\\defiant\\defiant_warming2.png", 0.3)
+        for name, spec in self.buttons.items():
+            if name not in self.__dict__:
+                self.preloader.submit(assets.load, spec[2])
+                self.preloader.submit(assets.load, spec[3])
 
     def pause(self):
 
         self.resume.draw(self.surf)
         self.quit_to_menu.draw(self.surf)
 
-        if self.ready_to_click:
+        if self.resume.clicked == True:
+            game_state.state = "main_game"
 
-            if self.resume.clicked == True:
-                self.ready_to_click = False
-                game_state.state = "main_game"
-
-            if self.quit_to_menu.clicked:
-                self.ready_to_click = False
-                game_state.state = 'base_menu'
+        if self.quit_to_menu.clicked:
+            game_state.state = 'base_menu'
+            game_state.end_flight()
 
     def base_menu(self):
 
@@ -414,13 +190,13 @@ class Menu:
         info_text2 = f"Money Available: {user.credits} credits"
         title_text = f"Welcome to Lunar Lander, by Rohan"
 
-        info1 = font.render(info_text1, True, (255, 255, 255))
-        info2 = font.render(info_text2, True, (255, 255, 255))
-        title = title_font.render(title_text, True, (255, 255, 255))
+        info1 = render_text(font, info_text1, True, (255, 255, 255))
+        info2 = render_text(font, info_text2, True, (255, 255, 255))
+        title = render_text(title_font, title_text, True, (255, 255, 255))
 
-        screen.blit(info1, [600, 240])
-        screen.blit(info2, [600, 260])
-        screen.blit(title, [200, 20])
+        dirty.blit(screen, info1, [600, 240])
+        dirty.blit(screen, info2, [600, 260])
+        dirty.blit(screen, title, [200, 20])
 
         self.play.draw(self.surf)
         self.quit_game.draw(self.surf)
@@ -429,41 +205,29 @@ class Menu:
         self.login.draw(self.surf)
         self.help_b.draw(self.surf)
 
-        if self.ready_to_click:
-
-            if self.play.clicked:
-                self.ready_to_click = False
-                game_state.state = "main_game"
-                game_state.seed = terrain.set_seed()
-                game_state.screen_l_x = 0
+        if self.play.clicked:
+            game_state.start_flight()
 
-                spacecraft.reset_pos()
+        if self.quit_game.clicked:
+            game_state.state = "QUIT"
 
-            if self.quit_game.clicked:
-                self.ready_to_click = False
-                game_state.state = "QUIT"
+        if self.login.clicked:
+            game_state.state = "login_menu"
 
-            if self.login.clicked:
-                self.ready_to_click = False
-                game_state.state = "login_menu"
+        if self.stats.clicked:
+            self.user_stats = user.get_stats()
+            game_state.state = "stats_menu"
 
-            if self.stats.clicked:
-                self.ready_to_click = False
-                self.user_stats = user.get_stats()
-                game_state.state = "stats_menu"
+        if self.shop.clicked:
+            game_state.state = "shop_menu"
 
-            if self.shop.clicked:
-                self.ready_to_click = False
-                game_state.state = "shop_menu"
-
-            if self.help_b.clicked:
-                self.ready_to_click = False
-                game_state.state = "help_menu"
+        if self.help_b.clicked:
+            game_state.state = "help_menu"
 
     def login_menu(self):
         text = False
 
-        output = font.render(self.login_output_text, True, (255, 255, 255))
+        output = render_text(font, self.login_output_text, True, (255, 255, 255))
         self.quit_to_menu.draw(self.surf)
 
         for event in events:
@@ -495,10 +259,9 @@ class Menu:
                 self.login_output_text = f"Input Invalid : {error}"
 
         if self.quit_to_menu.clicked == True:
-            self.ready_to_click = False
             game_state.state = "base_menu"
 
-        screen.blit(output, [250, 300])
+        dirty.blit(screen, output, [250, 300])
         self.login_input.update()
         self.login_input.draw(self.surf)
 
@@ -510,13 +273,12 @@ class Menu:
         self.quit_to_menu.draw(self.surf)
 
         for stat in self.user_stats:
-            output = font.render(stat, True, (255, 255, 255))
-            screen.blit(output, [x, y])
+            output = render_text(font, stat, True, (255, 255, 255))
+            dirty.blit(screen, output, [x, y])
 
             y += 30
 
         if self.quit_to_menu.clicked == True:
-            self.ready_to_click = False
             game_state.state = "base_menu"
 
     def help_menu(self):
@@ -526,12 +288,11 @@ class Menu:
         y = 100
 
         for line in helpText:
-            output = font.render(line, True, (255, 255, 255))
-            screen.blit(output, [x, y])
+            output = render_text(font, line, True, (255, 255, 255))
+            dirty.blit(screen, output, [x, y])
             y += 40
 
         if self.quit_to_menu.clicked == True:
-            self.ready_to_click = False
             game_state.state = "base_menu"
 
     def crash_menu(self):
@@ -539,12 +300,11 @@ class Menu:
         self.quit_to_menu.draw(self.surf)
 
         text = f"You crashed, your total score was {spacecraft.score}"
-        text_display = font.render(text, True, (255, 255, 255))
+        text_display = render_text(font, text, True, (255, 255, 255))
 
-        screen.blit(text_display, [395, 400])
+        dirty.blit(screen, text_display, [395, 400])
 
         if self.quit_to_menu.clicked == True:
-            self.ready_to_click = False
             game_state.state = "base_menu"
 
     def shop_menu(self):
@@ -554,7 +314,7 @@ class Menu:
         self.defiant_icon.draw(self.surf)
 
         money_text = f"Credits Available : {user.credits}"
-        money_display = font.render(money_text, True, (255, 255, 255))
+        money_display = render_text(font, money_text, True, (255, 255, 255))
 
         for craft in craft_list:
             outputText = ''
@@ -569,10 +329,10 @@ class Menu:
             else:
                 outputText = f"Cost : {craft[1]} Credits"
 
-            output = font.render(outputText, True, (255, 255, 255))
-            screen.blit(output, craft[2])
+            output = render_text(font, outputText, True, (255, 255, 255))
+            dirty.blit(screen, output, craft[2])
 
-        screen.blit(money_display, [395, 400])
+        dirty.blit(screen, money_display, [395, 400])
 
         if self.eagle_icon.clicked == True:
             self.purchase_or_equip("eagle")
@@ -581,7 +341,6 @@ class Menu:
             self.purchase_or_equip("defiant")
 
         if self.quit_to_menu.clicked == True:
-            self.ready_to_click = False
             game_state.state = "base_menu"
 
     def purchase_or_equip(self, craftname):
@@ -599,11 +358,8 @@ class Menu:
 
         user.save()
 
-    def set_ready_to_click(self):
-        self.ready_to_click = True
-
 
-def game_readout(data, seed, numChunks, coord):
+def game_readout(data, seed, chunk_counts, prefetch_counts, coord):
 
     vertical_speed = int(data[0][1]*100)
     if vertical_speed >= 0:
@@ -617,36 +373,22 @@ def game_readout(data, seed, numChunks, coord):
     else:
         horizontal_text = f"{abs(horizontal_speed)} <--"
 
-    vertical_readout = font.render(
-        vertical_text, True, (255, 255, 255))
-
-    horizontal_redout = font.render(
-        horizontal_text, True, (255, 255, 255))
-
-    fuel = font.render(
-        f"Fuel {int(data[1])}", True, (255, 255, 255)
-    )
-
-    alt = font.render(
-        f"Altitude {int(data[2])}", True, (255, 255, 255)
-    )
+    vertical_readout = render_text(
+        font, vertical_text, True, (255, 255, 255))
 
-    # dev tools
-
-    seed = font.render(
-        f"Seed {seed}", True, (255, 255, 255)
-    )
+    horizontal_redout = render_text(
+        font, horizontal_text, True, (255, 255, 255))
 
-    chunks = font.render(
-        f"Chunks Loaded {numChunks}", True, (255, 255, 255)
+    fuel = render_text(
+        font, f"Fuel {int(data[1])}", True, (255, 255, 255)
     )
 
-    x_cord = font.render(
-        f"Screen X coord {int(round(coord,-1))}", True, (255, 255, 255)
+    alt = render_text(
+        font, f"Altitude {int(data[2])}", True, (255, 255, 255)
     )
 
-    score = font.render(
-        f"Score {int(spacecraft.score)}", True, (255, 255, 255)
+    score = render_text(
+        font, f"Score {int(spacecraft.score)}", True, (255, 255, 255)
     )
 
     screen.blit(vertical_readout, [20, 20])
@@ -656,9 +398,26 @@ def game_readout(data, seed, numChunks, coord):
     screen.blit(score, [20, 140])
 
     if dev_tools:
+        seed = render_text(
+            font, f"Seed {seed}", True, (255, 255, 255)
+        )
+
+        chunks = render_text(
+            font, f"Chunks Loaded {chunk_counts[0]} ({chunk_counts[1]} evicted)", True, (255, 255, 255)
+        )
+
+        prefetch = render_text(
+            font, f"Prefetch Hits {prefetch_counts[0]} Misses {prefetch_counts[1]}", True, (255, 255, 255)
+        )
+
+        x_cord = render_text(
+            font, f"Screen X coord {int(round(coord,-1))}", True, (255, 255, 255)
+        )
+
         screen.blit(seed, [20, 140])
         screen.blit(chunks, [20, 170])
         screen.blit(x_cord, [20, 200])
+        screen.blit(prefetch, [20, 230])
 
 
 class GameState():
@@ -667,9 +426,56 @@ class GameState():
     def __init__(self):
         self.state = "base_menu"
         self.dev_tool_last_pressed = 0
+        self.profile_dump_last_pressed = 0
+        self.capture_last_pressed = 0
         self.screen_l_x = 0
 
-        self.counter = 1
+        # fixed timestep physics
+        self.frame_time = 0  # seconds the last frame took
+        self.accumulator = 0  # seconds not yet simulated
+        self.prev_screen_l_x = 0
+
+        self.recording = None  # Recording of the flight being played
+        self.replay_inputs = None  # inputs of a flight being replayed
+        self.replay_speed = 1
+
+    def start_flight(self, replay=None, speed=1):
+        "starts a new flight on a new seed, or replays a Recording at speed times real time"
+
+        self.state = "main_game"
+        self.screen_l_x = 0
+        self.prev_screen_l_x = 0
+        self.accumulator = 0
+
+        if replay is None:
+            self.seed = terrain.set_seed()
+            self.recording = Recording(
+                self.seed, terrain.get_map(), spacecraft.craft_name)
+            self.replay_inputs = None
+            self.replay_speed = 1
+
+        else:
+            if replay.craft != spacecraft.craft_name:
+                spacecraft.set_craft(replay.craft)
+            terrain.set_map(replay.map, replay.seed)
+
+            self.seed = replay.seed
+            self.recording = None
+            self.replay_inputs = replay.inputs()
+            self.replay_speed = speed
+
+        spacecraft.reset_pos()
+
+    def end_flight(self):
+        "saves the recording of the flight that just finished"
+
+        if self.recording is not None:
+            self.recording.finish(spacecraft.score, spacecraft.already_landed)
+            self.recording.save(os.path.join(
+                recording_data_folder,
+                f"{user.username}_{int(time.time())}_{self.seed}.llr"))
+
+            self.recording = None
 
     def login_menu(self):
         menu.login_menu()
@@ -703,7 +509,8 @@ class GameState():
         global font
         global dev_tools
 
-        key = pygame.key.get_pressed()
+        with profiler.time("input"):
+            key = pygame.key.get_pressed()
 
         now = time.time()
 
@@ -711,44 +518,100 @@ class GameState():
 
             if key[K_SPACE]:
                 self.seed = terrain.set_seed()
+                self.recording = None  # can't be replayed on one seed
 
         if key[K_0]:
             if now - self.dev_tool_last_pressed > 0.01:
 
                 dev_tools = not dev_tools
+                profiler.enabled = dev_tools  # timers cost nothing otherwise
 
             self.dev_tool_last_pressed = now
 
+        if key[K_9] and dev_tools:
+            if now - self.profile_dump_last_pressed > 0.5:
+                path = profiler.dump_csv(profiling_data_folder)
+                print(f"frame timings saved to {path}")
+
+                self.profile_dump_last_pressed = now
+
+        # cProfile everything from one press to the next
+        if key[K_8] and dev_tools:
+            if now - self.capture_last_pressed > 0.5:
+                path = capture.toggle()
+
+                if path is None:
+                    print("cProfile started")
+                else:
+                    print(f"cProfile stopped, saving to {path}.prof and {path}.txt")
+
+                self.capture_last_pressed = now
+
         if key[K_ESCAPE]:
             self.state = "pause_menu"
 
-        spacecraft_data = spacecraft.control(key)
+        # simulate in fixed steps whatever the frame rate, dropping time
+        # rather than falling further behind after a very slow frame
+        self.accumulator = min(self.accumulator + self.frame_time*self.replay_speed,
+                               MAX_STEPS_PER_FRAME * PHYSICS_STEP * self.replay_speed)
 
-        if spacecraft.pos[0] <= 200:
-            self.screen_l_x += spacecraft.velocity_vector[0]
-            spacecraft.pos = Vector2(200, spacecraft.pos[1])
+        while self.accumulator >= PHYSICS_STEP and self.state == "main_game":
+            self.physics_step(key)
+            self.accumulator -= PHYSICS_STEP
 
-        elif spacecraft.pos[0] >= 1000-200:
-            self.screen_l_x += spacecraft.velocity_vector[0]
-            spacecraft.pos = Vector2(1000-200, spacecraft.pos[1])
+        # draw between the last two steps by how far into the next one we are
+        # (steps stop early on a crash, so clamp it)
+        alpha = min(self.accumulator / PHYSICS_STEP, 1)
+        render_l_x = self.prev_screen_l_x + \
+            (self.screen_l_x - self.prev_screen_l_x) * alpha
 
-        game_readout(spacecraft_data, self.seed, len(
-            terrain.chunkList), self.screen_l_x)
+        spacecraft_data = (spacecraft.velocity_vector,
+                           int(spacecraft.fuel), spacecraft.pos[1])
 
-        # collision detection
+        with profiler.time("hud"):
+            game_readout(spacecraft_data, self.seed, terrain.chunk_counts(),
+                         terrain.prefetch_counts(), self.screen_l_x)
 
-        if self.counter % 3 == 0:
-            spacecraft.collision_detection()
+            if dev_tools:
+                profiler.draw(screen, font, [700, 20])
 
-        self.counter += 1
-        if self.counter == 100:
-            self.counter == 0
+        with profiler.time("terrain"):
+            terrain.update(render_l_x)
+            terrain.prefetch(render_l_x, spacecraft.velocity_vector[0])
 
-        spacecraft.update()
-        terrain.update(self.screen_l_x)
+        with profiler.time("draw"):
+            spacecraft.rect.center = spacecraft.render_pos(alpha)
+            all_sprites.draw(screen)
 
-        all_sprites.draw(screen)
-        terrain.draw_chunks(screen, self.screen_l_x)
+        with profiler.time("terrain_draw"):
+            terrain.draw_chunks(screen, render_l_x)
+
+    def physics_step(self, key):
+        "moves the game on by one fixed physics step"
+
+        if self.replay_inputs is not None:
+            bits = next(self.replay_inputs, None)
+
+            if bits is None:
+                # recording ended without a crash, the player left the flight
+                self.state = "base_menu"
+                return
+
+        else:
+            bits = input_bits(key)
+
+            if self.recording is not None:
+                self.recording.record(bits)
+
+        self.prev_screen_l_x = self.screen_l_x
+
+        # physics only sees the recorded keys, so a replay flies the same
+        self.screen_l_x, outcome = physics_step(
+            spacecraft, terrain, self.screen_l_x, ScriptedKeys(bits), profiler)
+
+        if outcome == "crashed":
+            self.state = "crashed"
+            self.end_flight()
 
     def get_state(self) -> str:
         return self.state
@@ -756,15 +619,15 @@ class GameState():
     def state_manager(self):
         global events
 
-        events = pygame.event.get()
+        with profiler.time("input"):
+            events = pygame.event.get()
 
         for event in events:
 
             if event.type == QUIT:
                 self.state = 'QUIT'
 
-            if event.type == MOUSEBUTTONUP:
-                menu.set_ready_to_click()
+        clicks.handle_events(events)
 
         if self.state == 'base_menu':
             self.base_menu()
@@ -798,40 +661,29 @@ map_data_folder = os.path.join("data", "maps")
 button_data_folder = os.path.join("data", "buttons")
 sound_data_folder = os.path.join("data", "sounds")
 user_data_folder = os.path.join("data", "users")
-
-# general setup
-pygame.init()
-pygame.mixer.init()
-clock = pygame.time.Clock()
-game_state = GameState()
+recording_data_folder = os.path.join("data", "recordings")
+profiling_data_folder = os.path.join("data", "profiling")
 
 # game screen setup
 SCREEN_WIDTH = 1000
 SCREEN_HEIGHT = 700
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Lunar Lander")
-
-
-# instance creation
 
-spacecraft = Spacecraft(craft_data_folder, sound_data_folder)
-terrain = Terrain(map_data_folder)
-menu = Menu(button_data_folder, craft_data_folder, screen)
-user = User(user_data_folder)
-font = pygame.font.Font(None, 25)
-title_font = pygame.font.Font(None, 50)
+# physics runs at a fixed rate, the craft constants are per step at this rate
+PHYSICS_RATE = 200
+PHYSICS_STEP = 1 / PHYSICS_RATE
+MAX_STEPS_PER_FRAME = 20
 
+# frame rate cap, changing it doesn't change how the craft flies
+RENDER_FPS = 120
 
-# pygame sprite management
+# menus drop to this frame rate after this many frames with nothing changing
+MENU_IDLE_FPS = 20
+MENU_IDLE_FRAMES = 30
 
-all_sprites = pygame.sprite.Group()
-all_sprites.add(spacecraft)
-
-global dev_tools
-global craft_list
 dev_tools = False
 
 craft_list = [["eagle", 100, [200, 200]], ["defiant", 10, [500, 200]]]
+
 helpText = ["Welcome to Lunar Lander", "A game developed by Rohan", "Use A and D to rotate",
             "W to thrust", "Land on pads to get refueled and earn points", "Try not to crash!"]
 
@@ -839,18 +691,98 @@ helpText = ["Welcome to Lunar Lander", "A game developed by Rohan", "Use A and D
 special_chars = "!@#$%^&*()-+?_=,<>/'\""
 
 
-# game loop
-running = True
+def main():
+    "opens the window and runs the game until it is closed"
+    global game_state, screen, spacecraft, terrain, menu, user, font, \
+        profiler, capture, title_font, all_sprites
+
+    # general setup
+    pygame.init()
+    pygame.mixer.init()
+    clock = pygame.time.Clock()
+    game_state = GameState()
+
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Lunar Lander")
+
+    # instance creation
+
+    spacecraft = Spacecraft(craft_data_folder, sound_data_folder)
+    profiler = FrameProfiler(("input", "physics", "collision", "terrain",
+                              "draw", "terrain_draw", "hud", "flip"))
+    terrain = Terrain(map_data_folder, profiler=profiler)
+    menu = Menu(button_data_folder, craft_data_folder, screen)
+    user = User(user_data_folder)
+    font = pygame.font.Font(None, 25)
+    capture = ProfileCapture(profiling_data_folder)
+    title_font = pygame.font.Font(None, 50)
+
+    # pygame sprite management
+
+    all_sprites = pygame.sprite.Group()
+    all_sprites.add(spacecraft)
+
+    # load the shop's crafts in the background so equipping one is instant
+    preload_crafts(craft_data_folder, [craft[0] for craft in craft_list])
+
+    # game loop
+    # python main.py --startup prints how long the first frame took and quits
+    startup_benchmark = sys.argv[1:] == ["--startup"]
+
+    # python main.py <recording> [speed] replays a recorded flight
+    if len(sys.argv) > 1 and not startup_benchmark:
+        speed = float(sys.argv[2]) if len(sys.argv) > 2 else 1
+        game_state.start_flight(Recording.load(sys.argv[1]), speed)
+
+    running = True
+    first_frame = True
+    last_state = None
+    idle_frames = 0
+
+    while running:
+        screen.fill((0, 0, 0))
+
+        # menus only send the parts of the screen that changed to the display,
+        # the game and a newly shown screen change everywhere. Decided before
+        # state_manager, which draws this state and may then change it
+        state = game_state.get_state()
+        if state == "main_game" or state != last_state:
+            dirty.add_all()
+
+        last_state = state
+
+        game_state.state_manager()
+
+        if game_state.get_state() == 'QUIT':
+            running = False
+
+        if events or dirty.changed():
+            idle_frames = 0
+        else:
+            idle_frames += 1
+
+        if idle_frames > MENU_IDLE_FRAMES:
+            game_state.frame_time = clock.tick(MENU_IDLE_FPS) / 1000
+        else:
+            game_state.frame_time = clock.tick(RENDER_FPS) / 1000
+
+        with profiler.time("flip"):
+            dirty.update()
+
+        profiler.end_frame()
+
+        if first_frame:
+            first_frame = False
 
-while running:
-    screen.fill((0, 0, 0))
+            if startup_benchmark:
+                print(f"first frame after {time.perf_counter() - START_TIME:.3f} s")
+                running = False
 
-    game_state.state_manager()
+            # the other screens are likely next
+            menu.preload()
 
-    if game_state.get_state() == 'QUIT':
-        running = False
+    pygame.quit()
 
-    clock.tick(200)
-    pygame.display.flip()
 
-pygame.quit()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+'''Light timers around each part of a frame, shown in the dev tools overlay
+and dumped to csv.'''
+import os
+import csv
+import time
+import cProfile
+import pstats
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pygame
+from utils import render_text
+
+
+class SectionTimer():
+    '''context manager adding the time spent inside it to one section of the
+    frame, a section timed inside another is taken out of the outer one'''
+
+    __slots__ = ("totals", "name", "start", "active")
+
+    def __init__(self, totals, name, active):
+        self.totals = totals
+        self.name = name
+        self.start = 0
+        self.active = active  # timers entered and not yet exited, shared by a profiler
+
+    def __enter__(self):
+        now = time.perf_counter()
+
+        if self.active:
+            outer = self.active[-1]
+            self.totals[outer.name] += now - outer.start
+
+        self.start = now
+        self.active.append(self)
+
+    def __exit__(self, *exc_info):
+        now = time.perf_counter()
+
+        self.totals[self.name] += now - self.start
+        self.active.pop()
+
+        if self.active:
+            self.active[-1].start = now  # outer section carries on from here
+
+
+class FrameProfiler():
+    '''Times named sections of every frame, keeping the last window frames.
+
+    While disabled time() hands back one shared do nothing context manager,
+    so the timers can stay in the game loop for the cost of a method call.'''
+
+    def __init__(self, sections, window=600, enabled=False):
+
+        self.sections = tuple(sections)
+        self.enabled = enabled
+
+        # seconds spent in each section so far this frame
+        self.totals = dict.fromkeys(self.sections, 0.0)
+        self.active = []
+        self.timers = {name: SectionTimer(self.totals, name, self.active)
+                       for name in self.sections}
+        self.disabled_timer = nullcontext()
+
+        # one row per frame, ms in each section then ms for the whole frame
+        self.samples = deque(maxlen=window)
+        self.frame_ms = deque(maxlen=window)  # last column of samples, for the graph
+        self.frames = 0  # number of the frame samples[-1] came from
+        self.frame_start = time.perf_counter()
+
+        # overlay numbers, only worked out again every refresh frames so
+        # the text stays the same long enough to read and to be cached
+        self.refresh = 15
+        self.shown_stats = None
+        self.shown_frame = 0
+
+    def time(self, name):
+        "returns context manager timing the code inside it as part of section name"
+
+        if self.enabled:
+            return self.timers[name]
+
+        return self.disabled_timer
+
+    def end_frame(self):
+        "stores this frame's section times, call once a frame after the display flip"
+
+        now = time.perf_counter()
+
+        if self.enabled:
+            row = [self.totals[name]*1000 for name in self.sections]
+            row.append((now - self.frame_start)*1000)
+
+            self.samples.append(row)
+            self.frame_ms.append(row[-1])
+            self.frames += 1
+
+            for name in self.sections:
+                self.totals[name] = 0.0
+
+        self.frame_start = now
+
+    def stats(self):
+        "returns mean and 99th percentile ms of each section and of the whole frame"
+
+        if not self.samples:
+            return None
+
+        samples = np.array(self.samples)
+
+        return samples.mean(axis=0), np.percentile(samples, 99, axis=0)
+
+    def draw(self, surface, font, pos, graph_size=(260, 50)):
+        "draws section averages, p99 and a frame time sparkline with top left at pos"
+
+        if self.shown_stats is None or self.frames - self.shown_frame >= self.refresh:
+            self.shown_stats = self.stats()
+            self.shown_frame = self.frames
+
+        stats = self.shown_stats
+        if stats is None:
+            return
+
+        x, y = pos
+        colour = (255, 255, 255)
+
+        for name, mean, p99 in zip(self.sections + ("frame",), *stats):
+            text = render_text(font, f"{name:<12} {mean:6.2f} {p99:6.2f} ms", True, colour)
+            surface.blit(text, (x, y))
+            y += 20
+
+        # frame times, scaled so the p99 frame is most of the height
+        width, height = graph_size
+        frame_ms = list(self.frame_ms)[-width:]
+        scale = (height - 5) / max(stats[1][-1], 1)
+
+        points = [(x + i, y + height - min(ms*scale, height))
+                  for i, ms in enumerate(frame_ms)]
+
+        pygame.draw.rect(surface, (80, 80, 80), (x, y, width, height), 1)
+        if len(points) > 1:
+            pygame.draw.lines(surface, colour, False, points)
+
+    def dump_csv(self, folder) -> str:
+        "writes the collected samples to a new csv file in folder, returns its path"
+
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"frames_{int(time.time())}.csv")
+
+        first = self.frames - len(self.samples) + 1
+
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(("frame",) + self.sections + ("frame_ms",))
+
+            for i, row in enumerate(self.samples):
+                writer.writerow([first + i] + [f"{ms:.4f}" for ms in row])
+
+        return path
+
+
+class ProfileCapture():
+    '''Starts and stops a cProfile session, saving a .prof file and a text
+    summary of the top functions to folder.
+
+    Only the thread that calls start() is profiled, the files are written
+    on a worker thread so stopping doesn't hold up the frame.'''
+
+    def __init__(self, folder, top=40):
+
+        self.folder = folder
+        self.top = top
+
+        self.profile = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    @property
+    def running(self) -> bool:
+        return self.profile is not None
+
+    def start(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self) -> str:
+        "stops profiling, returns path the files will be written to without extension"
+
+        profile = self.profile
+        profile.disable()
+        self.profile = None
+
+        path = os.path.join(self.folder, f"profile_{int(time.time())}")
+        self.executor.submit(self.write, profile, path)
+
+        return path
+
+    def toggle(self):
+        "starts profiling if it isn't running, otherwise stops it and returns the path"
+
+        if self.running:
+            return self.stop()
+
+        self.start()
+
+    def write(self, profile, path):
+        "saves profile to path.prof and its top functions by cumulative time to path.txt"
+
+        os.makedirs(self.folder, exist_ok=True)
+
+        profile.dump_stats(path + ".prof")
+
+        with open(path + ".txt", 'w') as f:
+            stats = pstats.Stats(profile, stream=f)
+            stats.sort_stats("cumulative").print_stats(self.top)
+
+
+# disabled profiler for code that can be profiled but usually isn't
+NO_PROFILER = FrameProfiler(())
@@ -0,0 +1,163 @@
+'''Compact binary flight logs: seed, map, craft and the input bitmask of every
+physics step, enough to replay a flight exactly.
+
+Inputs change rarely, so they are stored as runs of (bitmask, steps), each
+packed into one varint. A flight is a header plus a few bytes per second.'''
+import os
+import struct
+
+
+MAGIC = b"LLR"
+VERSION = 1
+
+# magic, version, seed, steps, score
+HEADER = struct.Struct("<3sBIII")
+
+INPUT_BITS = 3  # bits in an input bitmask, see simulation.INPUT_KEYS
+
+
+def write_varint(out: bytearray, value: int):
+    "appends unsigned int to out, 7 bits a byte, low bits first"
+
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+
+    out.append(value)
+
+
+def read_varint(data, pos):
+    "returns unsigned int at pos in data and the position after it"
+
+    value = 0
+    shift = 0
+
+    while True:
+        byte = data[pos]
+        pos += 1
+
+        value |= (byte & 0x7f) << shift
+        shift += 7
+
+        if byte < 0x80:
+            return value, pos
+
+
+def write_text(out: bytearray, text: str):
+    encoded = text.encode()
+    write_varint(out, len(encoded))
+    out += encoded
+
+
+def read_text(data, pos):
+    length, pos = read_varint(data, pos)
+    return bytes(data[pos:pos+length]).decode(), pos + length
+
+
+class Recording():
+    '''One flight: what it was flown on, its inputs, and the score and pads
+    landed on that the game reported at the end'''
+
+    def __init__(self, seed, map_name, craft_name):
+
+        self.seed = seed
+        self.map = map_name
+        self.craft = craft_name
+
+        self.runs = []  # [bitmask, steps held]
+        self.steps = 0
+
+        self.score = 0
+        self.landed = []  # pad numbers in the order they were first landed on
+
+    def __eq__(self, other):
+        return (isinstance(other, Recording) and self.seed == other.seed
+                and self.map == other.map and self.craft == other.craft
+                and self.runs == other.runs and self.steps == other.steps
+                and self.score == other.score and self.landed == other.landed)
+
+    def record(self, bits):
+        "adds the input bitmask of one physics step"
+
+        if self.runs and self.runs[-1][0] == bits:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([bits, 1])
+
+        self.steps += 1
+
+    def finish(self, score, landed):
+        "stores the result the game reported for the flight"
+
+        self.score = score
+        self.landed = list(landed)
+
+    def inputs(self):
+        "yields the input bitmask of every physics step in order"
+
+        for bits, steps in self.runs:
+            for i in range(steps):
+                yield bits
+
+    def to_bytes(self) -> bytes:
+
+        out = bytearray(HEADER.pack(
+            MAGIC, VERSION, self.seed, self.steps, self.score))
+
+        write_text(out, self.map)
+        write_text(out, self.craft)
+
+        # pads are chunk x positions, possibly negative, so zigzag encode them
+        write_varint(out, len(self.landed))
+        for pad in self.landed:
+            write_varint(out, (pad << 1) ^ (pad >> 63))
+
+        write_varint(out, len(self.runs))
+        for bits, steps in self.runs:
+            write_varint(out, steps << INPUT_BITS | bits)
+
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+
+        magic, version, seed, steps, score = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a flight recording")
+
+        pos = HEADER.size
+        map_name, pos = read_text(data, pos)
+        craft_name, pos = read_text(data, pos)
+
+        recording = cls(seed, map_name, craft_name)
+        recording.score = score
+
+        count, pos = read_varint(data, pos)
+        for i in range(count):
+            value, pos = read_varint(data, pos)
+            recording.landed.append((value >> 1) ^ -(value & 1))
+
+        count, pos = read_varint(data, pos)
+        for i in range(count):
+            value, pos = read_varint(data, pos)
+            recording.runs.append(
+                [value & (1 << INPUT_BITS) - 1, value >> INPUT_BITS])
+
+        recording.steps = sum(run[1] for run in recording.runs)
+        if recording.steps != steps:
+            raise ValueError("flight recording is truncated")
+
+        return recording
+
+    def save(self, path):
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
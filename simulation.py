@@ -0,0 +1,212 @@
+'''Runs flights without a window or sound, as fast as the cpu allows.
+The game and headless runs share physics_step so they fly the same.'''
+import os
+import sys
+import time
+import random
+from pygame.locals import (
+    K_UP,
+    K_LEFT,
+    K_RIGHT
+)
+from pygame.math import Vector2
+from spacecraft import Spacecraft
+from terrain import Terrain
+from recording import Recording
+from profiler import NO_PROFILER
+
+
+# input bitmasks, bit n is set when INPUT_KEYS[n] is held
+INPUT_KEYS = (K_UP, K_LEFT, K_RIGHT)
+
+# screen x the craft is held at while the terrain scrolls instead
+SCROLL_LEFT = 200
+SCROLL_RIGHT = 1000-200
+
+
+def physics_step(spacecraft, terrain, screen_l_x, key, profiler=NO_PROFILER):
+    '''moves the craft on by one fixed physics step, returns the new screen
+    left x and "crashed", "landed" or None'''
+
+    with profiler.time("physics"):
+        spacecraft.prev_pos = Vector2(spacecraft.pos)
+
+        spacecraft.control(key)
+
+        if spacecraft.pos[0] <= SCROLL_LEFT:
+            screen_l_x += spacecraft.velocity_vector[0]
+            spacecraft.pos = Vector2(SCROLL_LEFT, spacecraft.pos[1])
+
+        elif spacecraft.pos[0] >= SCROLL_RIGHT:
+            screen_l_x += spacecraft.velocity_vector[0]
+            spacecraft.pos = Vector2(SCROLL_RIGHT, spacecraft.pos[1])
+
+    with profiler.time("collision"):
+        outcome = spacecraft.collision_detection(terrain, screen_l_x)
+
+    with profiler.time("physics"):
+        spacecraft.update()
+
+    return screen_l_x, outcome
+
+
+def input_bits(key) -> int:
+    "packs the INPUT_KEYS of a pygame.key.get_pressed() result into a bitmask"
+
+    bits = 0
+    for i, k in enumerate(INPUT_KEYS):
+        if key[k]:
+            bits |= 1 << i
+
+    return bits
+
+
+class ScriptedKeys():
+    "stands in for pygame.key.get_pressed() with the keys of an input bitmask"
+
+    def __init__(self, bits=0):
+        self.bits = bits
+
+    def __getitem__(self, k):
+        if k in INPUT_KEYS:
+            return bool(self.bits >> INPUT_KEYS.index(k) & 1)
+
+        return False
+
+
+class Simulation():
+    '''A flight with no display or audio, driven by a stream of input
+    bitmasks, one per physics step'''
+
+    def __init__(self, craft_folder, map_folder, craft_name="eagle", seed=None):
+
+        self.spacecraft = Spacecraft(craft_folder, None, audio=False)
+        if craft_name != self.spacecraft.craft_name:
+            self.spacecraft.set_craft(craft_name)
+
+        self.terrain = Terrain(map_folder)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        "starts a new flight, returns the seed"
+
+        self.seed = self.terrain.set_seed(seed)
+        self.screen_l_x = 0
+        self.state = "main_game"
+        self.steps = 0
+        self.landings = 0
+
+        self.spacecraft.reset_pos()
+
+        return self.seed
+
+    def step(self, bits=0):
+        "runs one physics step with the keys in bits held, returns the state"
+
+        if self.state != "main_game":
+            return self.state
+
+        self.screen_l_x, outcome = physics_step(
+            self.spacecraft, self.terrain, self.screen_l_x, ScriptedKeys(bits))
+
+        # keeps the chunk cache bounded, chunks are generated when needed
+        self.terrain.update(self.screen_l_x)
+        self.steps += 1
+
+        if outcome == "crashed":
+            self.state = "crashed"
+        elif outcome == "landed":
+            self.landings += 1
+
+        return self.state
+
+    def run(self, inputs, max_steps=None):
+        '''steps through inputs until they run out, the craft crashes or
+        max_steps is reached, returns the result'''
+
+        for bits in inputs:
+            if max_steps is not None and self.steps >= max_steps:
+                break
+
+            if self.step(bits) != "main_game":
+                break
+
+        return self.result()
+
+    def replay(self, recording):
+        "flies a Recording again from the start, returns the result"
+
+        if recording.craft != self.spacecraft.craft_name:
+            self.spacecraft.set_craft(recording.craft)
+
+        if recording.map != self.terrain.get_map():
+            self.terrain.set_map(recording.map)
+
+        self.reset(recording.seed)
+
+        return self.run(recording.inputs())
+
+    def result(self) -> dict:
+        "returns summary of the flight so far"
+
+        return {
+            "seed": self.seed,
+            "state": self.state,
+            "steps": self.steps,
+            "score": self.spacecraft.score,
+            "landed": list(self.spacecraft.already_landed),
+            "fuel": int(self.spacecraft.fuel),
+            "landing_steps": self.landings,
+            "x": self.screen_l_x + self.spacecraft.pos[0],
+            "y": self.spacecraft.pos[1],
+        }
+
+
+def random_inputs(steps, rng=None):
+    '''returns a list of input bitmasks that holds each random choice of keys
+    for a while, like a player would'''
+
+    rng = rng or random.Random()
+    inputs = []
+
+    while len(inputs) < steps:
+        inputs += [rng.randrange(1 << len(INPUT_KEYS))] * rng.randint(20, 200)
+
+    return inputs[:steps]
+
+
+def benchmark(simulation, flights=20, steps=5000, rate=200):
+    "prints physics steps per second of headless flights against real time"
+
+    rng = random.Random(1)
+    total_steps = 0
+
+    start = time.perf_counter()
+    for i in range(flights):
+        simulation.reset(rng.randint(1, 1000000))
+        total_steps += simulation.run(random_inputs(steps, rng))["steps"]
+    elapsed = time.perf_counter() - start
+
+    per_second = total_steps / elapsed
+    print(f"{flights} flights, {total_steps} steps in {elapsed:.2f} s, "
+          f"{per_second:.0f} steps/s ({per_second / rate:.0f}x real time)")
+
+
+if __name__ == "__main__":
+
+    simulation = Simulation(os.path.join('data', 'spacecraft'),
+                            os.path.join("data", "maps"))
+
+    # python simulation.py [recordings] replays them, otherwise benchmarks
+    for path in sys.argv[1:]:
+        recording = Recording.load(path)
+
+        start = time.perf_counter()
+        result = simulation.replay(recording)
+        elapsed = time.perf_counter() - start
+
+        print(path, result, f"{result['steps'] / 200 / elapsed:.0f}x real time")
+
+    if len(sys.argv) == 1:
+        print(simulation.run(random_inputs(5000), max_steps=5000))
+        benchmark(simulation)
@@ -0,0 +1,404 @@
+import os
+import math
+import json
+import time
+import threading
+import numpy as np
+import pygame
+from pygame.locals import (
+    K_UP,
+    K_LEFT,
+    K_RIGHT
+)
+from pygame.math import Vector2
+from concurrent.futures import ThreadPoolExecutor
+from utils import LRUCache, assets, display_format
+
+
+class CraftAssets():
+    '''Everything loaded for one craft: its constants from json, its animation
+    frames resized by scale and the rotations worked out from them'''
+
+    def __init__(self, craft_folder, craft_name, scale=None, rotation_cache_size=512):
+
+        self.name = craft_name
+        self.path = os.path.join(craft_folder, craft_name)
+
+        with open(os.path.join(self.path, f"{craft_name}.json"), 'r') as f:
+            self.data = json.load(f)
+
+        self.scale = self.data["resize"] if scale is None else scale
+
+        # physics uses masks of these, so they are left as loaded
+        # (not converted) to fly the same with or without a display
+        self.base = assets.image(
+            os.path.join(self.path, self.data["craft"]), self.scale,
+            colorkey=(255, 255, 255), convert=False)
+
+        self.warm = [assets.image(os.path.join(self.path, image), self.scale, convert=False)
+                     for image in self.data["warm_up"]]  # for throttling up or down
+        self.flicker = [assets.image(os.path.join(self.path, image), self.scale, convert=False)
+                        for image in self.data["flicker"]]  # for constant power flicker
+
+        # rotated frames with their collision outlines, see Spacecraft.rotated
+        self.rotations = LRUCache(rotation_cache_size)
+
+
+# loaded crafts keyed by (craft folder, craft name, scale), shared by every
+# Spacecraft so switching back to a craft doesn't load or rotate it again
+craft_cache = LRUCache(8)
+craft_cache_lock = threading.Lock()  # crafts can be loaded in the background
+preload_executor = ThreadPoolExecutor(max_workers=1)
+
+
+def load_craft(craft_folder, craft_name, scale=None, rotation_cache_size=512) -> CraftAssets:
+    "returns the craft's assets, only loading them the first time"
+
+    key = (craft_folder, craft_name, scale)
+
+    with craft_cache_lock:
+        craft = craft_cache.get(key)
+
+    if craft is None:
+        craft = CraftAssets(craft_folder, craft_name, scale, rotation_cache_size)
+
+        with craft_cache_lock:
+            # another thread may have loaded it meanwhile, keep theirs
+            craft = craft_cache.get(key) or craft
+            craft_cache[key] = craft
+
+    return craft
+
+
+def preload_crafts(craft_folder, craft_names):
+    "starts loading crafts in the background, returns futures of their assets"
+
+    return [preload_executor.submit(load_craft, craft_folder, name)
+            for name in craft_names]
+
+
+class Spacecraft(pygame.sprite.Sprite):
+    '''Controls spacecraft'''
+
+    def __init__(self, craft_folder: str, sound_folder: str, start_velocity: tuple = (0, 0.05), pos=(200, 50),
+                 rotation_step=1.0, rotation_cache_size=512, audio=True):
+
+        super().__init__()
+
+        self.craft_folder = craft_folder
+        self.sound_folder = sound_folder
+        self.audio = audio  # False to run without the mixer, e.g. headless
+
+        self.craft_name = ""
+
+        self.start_velocity = start_velocity
+        self.start_pos = pos
+
+        self.velocity_vector = Vector2(start_velocity)
+        self.thrust_vector = Vector2()
+        self.acceleration_vector = Vector2()
+        self.gravity_vector = Vector2(0, 0.0004)
+
+        # define spacecraft constants
+        self.thrust = 0
+        self.change_angle = 0
+        self.fuel = 0
+        self.fuel_rate = 0
+
+        # animation variables
+        self.is_flickering = False
+        self.current_sprite = 0
+        self.engine = False
+        self.frame = ("base", 0)  # which animation frame self.craft is
+
+        # rotated sprites with their collision outlines, keyed by
+        # (frame, angle rounded to rotation_step), kept with the craft's assets
+        self.rotation_step = rotation_step
+        self.rotation_cache_size = rotation_cache_size
+
+        # collision, world position of sprite top left at last check
+        self.last_topleft = None
+        self.contact = None  # (t, x, y) of last terrain contact
+
+        # initial setup
+        self.angle = 0
+        self.craft_name = "eagle"  # set starter spacecraft
+        self.set_craft(self.craft_name)
+
+        self.engine_sound_loaded = False  # loaded at the start of the first flight
+
+    def load_engine_sound(self):
+        "starts the engine sound looping, paused until the engine is on"
+
+        pygame.mixer.music.load(os.path.join(self.sound_folder, "engine_sound.wav"))
+        pygame.mixer.music.play(-1)
+        pygame.mixer.music.pause()
+
+        self.engine_sound_loaded = True
+
+    def reset_pos(self):
+
+        if self.audio and not self.engine_sound_loaded:
+            self.load_engine_sound()
+
+        self.velocity_vector = Vector2(self.start_velocity)
+        self.angle = 0
+        self.fuel = self.total_fuel
+        self.already_landed = []
+        self.score = 0
+        self.last_topleft = None
+
+        # engine starts off, so a flight doesn't depend on how the last one ended
+        self.engine = False
+        self.is_flickering = False
+        self.current_sprite = 0
+        self.frame = ("base", 0)
+        self.craft = self.craft_base
+        self.image, self.outline, self.lowest = self.rotated(
+            self.frame, self.craft, self.angle)
+
+        self.pos = Vector2(self.start_pos)
+        self.prev_pos = Vector2(self.pos)  # position at the last physics step
+
+    def set_craft(self, craft_name, pos=(200, 50)):
+        '''Loads spacecraft from folder, or from the craft cache if it has been loaded before'''
+        self.craft_name = craft_name
+        self.craft_data_path = os.path.join(self.craft_folder, self.craft_name)
+
+        craft = load_craft(self.craft_folder, craft_name,
+                           rotation_cache_size=self.rotation_cache_size)
+        data = craft.data
+
+        self.change_angle = float(data['turn_rate'])
+        self.thrust = float(data["thrust"])
+        self.resize = craft.scale
+        self.fuel = data["fuel"]
+        self.total_fuel = data["fuel"]
+        self.fuel_rate = data["fuel_rate"]
+        self.pad_height = data["pad_height"]
+
+        self.craft_base = craft.base
+        self.warm = craft.warm
+        self.flicker = craft.flicker
+        self.rotations = craft.rotations
+
+        self.craft = self.craft_base
+        self.frame = ("base", 0)
+
+        self.image = self.craft
+        self.outline, self.lowest = self.collision_shape(self.image)
+        self.rect = self.image.get_rect()
+        self.pos = Vector2(pos)
+        self.prev_pos = Vector2(self.pos)
+
+    def get_craft(self) -> str:
+        '''Returns currently loaded craft'''
+        return self.craft
+
+    def control(self, key):
+        "handle player input"
+
+        self.thrust_vector = Vector2(0, 0)  # reset thrust vector each loop
+        self.engine = False  # flag for animation
+
+        if key[K_UP]:
+
+            if self.fuel >= 0:
+
+                horizontal_acc = - \
+                    (math.sin(math.radians(self.angle))*self.thrust)
+                vertical_acc = - \
+                    (math.cos(math.radians(self.angle))*self.thrust)
+
+                self.thrust_vector = Vector2(horizontal_acc,
+                                             vertical_acc)
+                self.engine = True
+
+                self.fuel += -self.fuel_rate
+
+        if key[K_LEFT]:
+            self.angle += self.change_angle
+
+        if key[K_RIGHT]:
+            self.angle += -self.change_angle
+
+        return self.velocity_vector, int(self.fuel), self.pos[1]
+
+    def update(self):
+        "update sprite location"
+
+        self.rot_update()
+
+        self.pos += self.velocity_vector
+        self.acceleration_vector = self.gravity_vector + self.thrust_vector
+        self.velocity_vector += self.acceleration_vector
+        self.rect.center = self.pos  # air resistance
+
+        self.animate_engine()
+
+    def render_pos(self, alpha):
+        "position to draw at, alpha of the way from the last physics step to this one"
+        return self.prev_pos.lerp(self.pos, alpha)
+
+    def rot_update(self):
+        "rotate the sprite about it's center, updates image attribute to currently selected craft"
+        self.image, self.outline, self.lowest = self.rotated(
+            self.frame, self.craft, self.angle)
+        self.rect = self.image.get_rect(center=self.rect.center)
+
+        if self.angle >= 360:
+            self.angle = 0
+
+        if self.angle < 0:
+            self.angle = 360
+
+    def rotated(self, frame, image, angle):
+        '''returns image rotated to angle with its outline and lowest point,
+        these are only worked out once per frame and step'''
+
+        angle = round(angle / self.rotation_step) * self.rotation_step % 360
+        key = (frame, angle)
+
+        rotated = self.rotations.get(key)
+        if rotated is None:
+            rotated_image = pygame.transform.rotozoom(image, angle, 1)
+
+            # outline from the unconverted image, the converted one is drawn
+            rotated = (display_format(rotated_image),) + \
+                self.collision_shape(rotated_image)
+            self.rotations[key] = rotated
+
+        return rotated
+
+    def collision_shape(self, image):
+        "returns outline points of image and its lowest point, relative to its top left"
+
+        outline = pygame.mask.from_surface(image).outline(every=5)
+
+        lowest = (0, 0)
+
+        for coord in outline:
+            if coord[1] > lowest[1]:
+                lowest = coord
+
+        return np.array(outline, dtype=np.float64).reshape(-1, 2), lowest
+
+    def animate_engine(self):
+        "animates engine if engine variable is true"
+        if self.engine == True:
+
+            if self.audio:
+                pygame.mixer.music.unpause()
+
+            if self.is_flickering == True:
+                if self.current_sprite >= len(self.flicker):
+                    self.current_sprite = 0
+
+                self.frame = ("flicker", int(self.current_sprite))
+                self.craft = self.flicker[self.frame[1]]
+                self.current_sprite += 0.1
+
+            elif self.is_flickering == False:
+
+                if self.current_sprite >= len(self.warm):
+                    self.current_sprite = 0
+                    self.is_flickering = True
+
+                else:
+                    self.frame = ("warm", int(self.current_sprite))
+                    self.craft = self.warm[self.frame[1]]
+                    self.current_sprite += 0.2
+
+        else:
+            self.current_sprite = 0
+            self.is_flickering = False
+            self.frame = ("base", 0)
+            self.craft = self.craft_base
+
+            if self.audio:
+                pygame.mixer.music.pause()
+
+    def get_image_size(self):
+        return self.rect.width, self.rect.height
+
+    def collision_detection(self, terrain, screen_l_x):
+        '''sweeps the craft outline from where it was at the last check to where
+        it is now, so it can't pass through thin ridges between frames,
+        returns "crashed", "landed" or None'''
+
+        topleft = self.image.get_rect(center=self.pos).topleft
+        topleft = (topleft[0] + screen_l_x, topleft[1])
+        last_topleft = self.last_topleft or topleft
+        self.last_topleft = topleft
+
+        self.contact = terrain.sweep_contact(self.outline, last_topleft, topleft)
+
+        if self.contact is None:
+            return None
+
+        t, x, y = self.contact
+
+        pad = terrain.get_pad_number(x - screen_l_x, screen_l_x)
+        if pad is None:
+            return "crashed"
+
+        if self.velocity_vector[1] < 100000:
+            coords = terrain.pad_position(pad, screen_l_x)
+
+            self.pos = Vector2(
+                coords[0], coords[1] - self.pad_height)
+            self.velocity_vector = Vector2(0, 0)
+            self.angle = 0
+
+            if pad not in self.already_landed:
+                self.already_landed.append(pad)
+                self.fuel += 100
+                self.score += 10
+
+            return "landed"
+
+        return "crashed"
+
+
+def benchmark_rotation(spacecraft, frames=2000):
+    '''returns us per frame spent rotating and drawing the craft with the
+    rotation cache turned off and with it on, the angle swinging +-30
+    degrees while the engine frames cycle'''
+
+    animation = ([(("base", 0), spacecraft.craft_base)]
+                 + [(("warm", i), image) for i, image in enumerate(spacecraft.warm)]
+                 + [(("flicker", i), image) for i, image in enumerate(spacecraft.flicker)])
+
+    surface = pygame.display.get_surface() or pygame.Surface((1000, 700))
+    rotations = spacecraft.rotations
+    results = []
+
+    # a cache that holds nothing rotates every frame, as before it existed
+    for cache in (LRUCache(0), rotations):
+        spacecraft.rotations = cache
+
+        start = time.perf_counter()
+        for i in range(frames):
+            spacecraft.frame, spacecraft.craft = animation[i // 10 % len(animation)]
+            spacecraft.angle = 30*math.sin(i / 50) % 360
+
+            spacecraft.rot_update()
+            surface.blit(spacecraft.image, spacecraft.rect)
+
+        results.append((time.perf_counter() - start) * 1e6 / frames)
+
+    spacecraft.rotations = rotations
+
+    return results
+
+
+if __name__ == "__main__":
+    pygame.display.set_mode((1000, 700))
+
+    spacecraft = Spacecraft(os.path.join('data', 'spacecraft'), None, audio=False)
+
+    for craft_name in ("eagle", "defiant"):
+        spacecraft.set_craft(craft_name)
+
+        uncached, cached = benchmark_rotation(spacecraft)
+        print(f"{craft_name}: {uncached:.1f} us per frame uncached, {cached:.1f} us cached")
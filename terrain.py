@@ -1,20 +1,197 @@
-import matplotlib.pyplot as plt
+import numpy as np
 import noise
 import random
 import pygame
 import json
 import os
+import sys
+import time
+import hashlib
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from profiler import NO_PROFILER
+
+
+# permutation table from the noise library's C perlin implementation
+PERM = np.array([
+    151, 160, 137, 91, 90, 15, 131, 13, 201, 95, 96, 53, 194, 233, 7, 225,
+    140, 36, 103, 30, 69, 142, 8, 99, 37, 240, 21, 10, 23, 190, 6, 148,
+    247, 120, 234, 75, 0, 26, 197, 62, 94, 252, 219, 203, 117, 35, 11, 32,
+    57, 177, 33, 88, 237, 149, 56, 87, 174, 20, 125, 136, 171, 168, 68, 175,
+    74, 165, 71, 134, 139, 48, 27, 166, 77, 146, 158, 231, 83, 111, 229, 122,
+    60, 211, 133, 230, 220, 105, 92, 41, 55, 46, 245, 40, 244, 102, 143, 54,
+    65, 25, 63, 161, 1, 216, 80, 73, 209, 76, 132, 187, 208, 89, 18, 169,
+    200, 196, 135, 130, 116, 188, 159, 86, 164, 100, 109, 198, 173, 186, 3, 64,
+    52, 217, 226, 250, 124, 123, 5, 202, 38, 147, 118, 126, 255, 82, 85, 212,
+    207, 206, 59, 227, 47, 16, 58, 17, 182, 189, 28, 42, 223, 183, 170, 213,
+    119, 248, 152, 2, 44, 154, 163, 70, 221, 153, 101, 155, 167, 43, 172, 9,
+    129, 22, 39, 253, 19, 98, 108, 110, 79, 113, 224, 232, 178, 185, 112, 104,
+    218, 246, 97, 228, 251, 34, 242, 193, 238, 210, 144, 12, 191, 179, 162, 241,
+    81, 51, 145, 235, 249, 14, 239, 107, 49, 192, 214, 31, 181, 199, 106, 157,
+    184, 84, 204, 176, 115, 121, 50, 45, 127, 4, 150, 254, 138, 236, 205, 93,
+    222, 114, 67, 29, 24, 72, 243, 141, 128, 195, 78, 66, 215, 61, 156, 180,
+], dtype=np.int64)
+
+# gradient of each lattice point, as grad1() in noise's _perlin.c
+GRAD = np.where(PERM & 8, -1, (PERM & 7) + 1).astype(np.float32)
+
+
+def pnoise1_array(x, octaves=1, persistence=0.5, lacunarity=2.0, repeat=1024):
+    '''vectorised noise.pnoise1, gives identical values for every element of x
+
+    all octaves are computed at once as rows of one array, arithmetic is
+    float32 in the same order as noise1() in noise's _perlin.c'''
+
+    x = np.asarray(x, dtype=np.float64).astype(np.float32)
+
+    freqs = [np.float32(1)]
+    amps = [np.float32(1)]
+    for i in range(octaves-1):
+        freqs.append(freqs[-1] * np.float32(lacunarity))
+        amps.append(amps[-1] * np.float32(persistence))
+
+    repeats = np.array([int(repeat * freq) for freq in freqs])[:, None]
+
+    x = x * np.array(freqs, dtype=np.float32)[:, None]  # one row per octave
+
+    floor = np.floor(x)
+    i = np.fmod(floor.astype(np.int64), repeats)  # C style remainder
+    ii = np.fmod(i + 1, repeats)
+
+    x = x - floor
+    fx = x*x*x * (x * (x * np.float32(6) - np.float32(15)) + np.float32(10))
+
+    a = GRAD[i & 255] * x
+    b = GRAD[ii & 255] * (x - np.float32(1))
+    octave_noise = (a + fx * (b - a)) * np.float32(0.4)
+
+    if octaves == 1:
+        return octave_noise[0].astype(np.float64)
+
+    # sum octaves one at a time to keep the C rounding
+    total = np.zeros(x.shape[1], dtype=np.float32)
+    total_amp = np.float32(0)
+
+    for octave, amp in zip(octave_noise, amps):
+        total = total + octave * amp
+        total_amp = total_amp + amp
+
+    return (total / total_amp).astype(np.float64)
+
+
+class Chunk():
+    '''one chunk of terrain, heights are kept in a compact int32 array and the
+    x of sample i is startx + i*spacing
+
+    pads in the chunk are [startx, endx, y] lists sorted by startx, and the
+    chunk's pre-drawn surface is kept on it, so both are loaded and evicted
+    along with it'''
+
+    __slots__ = ("startx", "spacing", "heights", "pads", "pad_starts", "surface")
+
+    def __init__(self, startx, spacing, heights, pads=()):
+
+        self.startx = int(startx)
+        self.spacing = int(spacing)
+        self.heights = np.asarray(heights, dtype=np.int32)
+
+        self.pads = sorted(pads)
+        self.pad_starts = [pad[0] for pad in self.pads]
+
+        self.surface = None  # (surface, world topleft) once drawn
+
+    def __len__(self):
+        return len(self.heights)
+
+    def __eq__(self, other):
+        return (isinstance(other, Chunk) and self.startx == other.startx
+                and self.spacing == other.spacing
+                and np.array_equal(self.heights, other.heights)
+                and self.pads == other.pads)
+
+    @property
+    def endx(self) -> int:
+        "x of last sample"
+        return self.startx + (len(self.heights)-1) * self.spacing
+
+    def points(self, screen_l_x=0) -> np.ndarray:
+        "returns (n, 2) array of sample points shifted into screen space"
+
+        points = np.empty((len(self.heights), 2), dtype=np.int32)
+        points[:, 0] = np.arange(self.startx - int(screen_l_x), self.endx -
+                                 int(screen_l_x) + 1, self.spacing)
+        points[:, 1] = self.heights
+
+        return points
+
+    def to_list(self) -> list:
+        "returns chunk as list of (x,y) tuples"
+        return [tuple(point) for point in self.points().tolist()]
+
+    def height_at(self, x) -> float:
+        "returns terrain y at world x by interpolating between the two samples around it"
+
+        # samples are evenly spaced so the segment is found directly
+        index = min(max(int((x - self.startx) // self.spacing), 0), len(self.heights)-2)
+
+        sx = self.startx + index*self.spacing
+        sy = int(self.heights[index])
+        ey = int(self.heights[index+1])
+
+        return sy + ((x-sx)/self.spacing) * (ey-sy)
+
+    def pad_at(self, x):
+        "returns pad under world x, None if there isn't one"
+
+        index = bisect_right(self.pad_starts, x) - 1
+
+        if index >= 0 and x <= self.pads[index][1]:
+            return self.pads[index]
+
+        return None
+
+    def heights_at(self, x) -> np.ndarray:
+        "returns terrain y for an array of world x values, see height_at"
+
+        x = np.asarray(x, dtype=np.float64)
+
+        index = np.clip((x - self.startx) // self.spacing,
+                        0, len(self.heights)-2).astype(np.int64)
+
+        sx = self.startx + index*self.spacing
+        sy = self.heights[index]
+        ey = self.heights[index+1]
+
+        return sy + ((x-sx)/self.spacing) * (ey-sy)
 
 
 class Terrain():
 
-    def __init__(self, path):
+    def __init__(self, path, max_chunks=12, profiler=NO_PROFILER):
 
-        self.preChunk = []
-        self.midChunk = []
-        self.postChunk = []
+        self.preChunk = None
+        self.midChunk = None
+        self.postChunk = None
 
         self.map_path = path
+        self.chunk_width = 1000
+
+        # pre, mid and post chunks must always fit in the cache
+        self.max_chunks = max(3, max_chunks)
+
+        # background chunk generation
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.prefetch_frames = 300  # how far ahead to predict, in physics steps
+
+        # chunks queued either side of the screen, one more than update uses,
+        # so crossing into a new chunk finds its neighbour ready
+        self.prefetch_margin = 2
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
+
+        # chunks made on a miss are timed as terrain whatever asked for them
+        self.profiler = profiler
 
         self.set_map("moon")
 
@@ -22,10 +199,9 @@ class Terrain():
         "loads map from json file"
 
         self.map = new_map
-        self.chunkList = []
 
-        map_path = self.map_path + "\\" + self.map
-        with open(map_path+f"\\{self.map}.json", 'r') as f:
+        map_path = os.path.join(self.map_path, self.map)
+        with open(os.path.join(map_path, f"{self.map}.json"), 'r') as f:
             data = json.load(f)
 
             self.octaves = data["octaves"]
@@ -49,8 +225,12 @@ class Terrain():
         else:
             self.seed = seed
 
-        self.chunkList = []
-        self.pads = []
+        self.chunks = OrderedDict()  # chunk start x -> chunk, oldest first
+        self.evicted = 0
+
+        # futures from the old seed are dropped, not waited for
+        self.pending = {}  # chunk start x -> future of chunk
+        self.prefetched = set()  # prefetched chunk starts not yet used
 
         return self.seed
 
@@ -64,9 +244,64 @@ class Terrain():
 
         return y
 
-    def gen_chunk(self, startx: int, endx: int) -> list:
+    def get_perlin_array(self, x) -> np.ndarray:
+        "returns perlin noise for an array of x values, same as get_perlin"
+
+        value = pnoise1_array(x*self.frequency, self.octaves)
+        y = np.abs(value*self.mult)**self.exp
+
+        return np.where(value < 0, -y, y)
+
+    def chunk_rng(self, startx) -> np.random.Generator:
+        '''returns random generator for the chunk starting at startx
+
+        seeded only from map, seed and chunk index so a chunk comes out the
+        same whatever order (or process) chunks are generated in'''
+
+        index = int(startx) // self.chunk_width
+        key = f"{self.map}:{self.seed}:{index}".encode()
+        chunk_seed = int.from_bytes(
+            hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+        return np.random.default_rng(chunk_seed)
 
-        chunk = []  # list of (x,y) tuples
+    def gen_chunk(self, startx: int, endx: int) -> Chunk:
+        '''generates chunk with whole chunk heights computed in one go,
+        doesn't change terrain state so it is safe to run on a worker thread'''
+
+        pads = []
+
+        startx, endx, = int(startx), int(endx)
+
+        x = np.arange(startx, endx, self.spacing)
+
+        straight = self.chunk_rng(startx).integers(1, 51, size=len(x))
+
+        y = self.get_perlin_array((x + self.seed).astype(np.float64))
+        y = y.astype(np.int64) + self.offset  # int() truncates towards zero
+
+        # pads are rare, so walk only the candidate samples
+        candidates = np.flatnonzero(
+            (straight == 1) & (x > startx+50) & (x < endx-50))
+
+        pad_end = -1
+        for index in candidates.tolist():
+            if index <= pad_end:
+                continue  # still on previous pad
+
+            pad_y = int(y[index-1])
+            pad_end = index + 5
+
+            y[index:pad_end+1] = pad_y
+            pads.append([int(x[index]), int(x[index])+self.spacing*5, pad_y])
+
+        return Chunk(startx, self.spacing, y, pads)
+
+    def gen_chunk_scalar(self, startx: int, endx: int) -> Chunk:
+        "generates chunk one sample at a time, reference for gen_chunk"
+
+        heights = []
+        pads = []
 
         y = 400
 
@@ -74,16 +309,17 @@ class Terrain():
 
         startx, endx, = int(startx), int(endx)
 
-        for i in range(startx, endx, self.spacing):
+        samples = range(startx, endx, self.spacing)
+        draws = self.chunk_rng(startx).integers(1, 51, size=len(samples))
 
-            straight = random.randint(1, 50)
+        for i, straight in zip(samples, draws.tolist()):
 
             if remaining > 0:
                 remaining += - 1
 
             elif straight == 1 and i > startx+50 and i < endx - 50:
                 remaining = 5
-                self.pads.append([i, i+self.spacing*5, y])
+                pads.append([i, i+self.spacing*5, y])
 
             else:
                 y = int(self.get_perlin(i+self.seed))
@@ -91,27 +327,33 @@ class Terrain():
 
                 remaining = 0
 
-            chunk.append((i, y))
+            heights.append(y)
 
-        return chunk
+        return Chunk(startx, self.spacing, heights, pads)
+
+    def get_pad(self, x):
+        "returns pad under world x, None if there isn't one"
+
+        startx = int(x // self.chunk_width) * self.chunk_width
+
+        return self.get_chunk(startx).pad_at(x)
 
     def get_pad_number(self, x, screen_l_x):
+        '''returns number of pad under screen x, None if there isn't one
 
-        x += screen_l_x
-        pad_number = False
+        a pad's number is its start x, so it stays the same if its chunk is
+        evicted and generated again'''
 
-        x = int(x)
+        pad = self.get_pad(int(x + screen_l_x))
 
-        for index, pad in enumerate(self.pads):
-            if x in range(pad[0], pad[1]+1):
-                pad_number = index
-                break
+        if pad is None:
+            return None
 
-        return pad_number
+        return pad[0]
 
     def pad_position(self, pad_number, screen_l_x):
 
-        pad = self.pads[pad_number]
+        pad = self.get_pad(pad_number)
 
         x = (pad[1]+pad[0])/2
         y = pad[2]
@@ -120,10 +362,14 @@ class Terrain():
 
     def plot_chunk(self, chunk):
         "plots chunk using pyplot and prints raw values"
-        x_list = [i[0] for i in chunk]
-        y_list = [i[1] for i in chunk]
+        # debug only, and slow to import, so not imported with the module
+        import matplotlib.pyplot as plt
+
+        points = chunk.points()
+        x_list = points[:, 0]
+        y_list = points[:, 1]
 
-        print(chunk)
+        print(chunk.to_list())
 
         plt.plot(x_list, y_list)
         plt.show()
@@ -131,90 +377,320 @@ class Terrain():
     def display(self, surface, chunk):
         "displays chunk on screen"
 
-        rect = pygame.draw.lines(surface, (255, 255, 255), False, chunk, 2)
+        rect = pygame.draw.lines(surface, (255, 255, 255), False, chunk.tolist(), 2)
         # use rect to check for collisions
 
     def update(self, screen_l_x):
         "manages what chunk to load and generate based on screen x coordinate"
 
-        middle_chunk_pos = round(screen_l_x, -3)  # nearest chunk start
+        width = self.chunk_width
 
-        self.preChunk = []
-        self.midChunk = []
-        self.postChunk = []
+        # nearest chunk start
+        middle_chunk_pos = int(round(screen_l_x / width)) * width
 
-        for chunk in self.chunkList:
+        self.preChunk = self.get_chunk(middle_chunk_pos-width)
+        self.midChunk = self.get_chunk(middle_chunk_pos)
+        self.postChunk = self.get_chunk(middle_chunk_pos+width)
 
-            if chunk[0][0] == middle_chunk_pos-1000:
-                self.preChunk = chunk
+    def get_chunk(self, startx) -> Chunk:
+        '''returns chunk starting at startx, generating it if it is not loaded
 
-            elif chunk[0][0] == middle_chunk_pos:
-                self.midChunk = chunk
+        a miss blocks the calling thread, on generating the chunk or on waiting
+        for the worker, which may have other chunks queued ahead of it. The
+        game prefetches far enough ahead that it only misses on the first
+        frame after set_seed, headless runs don't prefetch and always generate here'''
 
-            elif chunk[0][0] == middle_chunk_pos+1000:
-                self.postChunk = chunk
+        chunk = self.chunks.get(startx)
 
-        if self.preChunk == []:
-            self.preChunk = self.gen_chunk(
-                middle_chunk_pos-1000, middle_chunk_pos+self.spacing)
-            self.chunkList.append(self.preChunk)
+        if chunk is None:
+            self.prefetch_misses += 1
 
-        if self.midChunk == []:
-            self.midChunk = self.gen_chunk(
-                middle_chunk_pos, middle_chunk_pos+1000+self.spacing)
-            self.chunkList.append(self.midChunk)
+            with self.profiler.time("terrain"):
+                future = self.pending.pop(startx, None)
+                if future is not None:
+                    # already being generated, waiting is quicker than starting again
+                    chunk = future.result()
+                else:
+                    chunk = self.gen_chunk(
+                        startx, startx+self.chunk_width+self.spacing)
 
-        if self.postChunk == []:
-            self.postChunk = self.gen_chunk(
-                middle_chunk_pos+1000, middle_chunk_pos+2000+self.spacing)
-            self.chunkList.append(self.postChunk)
+            self.add_chunk(startx, chunk)
 
-    def convert_chunks(self, screen_l_x):
-        screen_l_x = int(screen_l_x)
-        preChunk = [(i[0] - screen_l_x, i[1]) for i in self.preChunk]
-        midChunk = [(i[0] - screen_l_x, i[1]) for i in self.midChunk]
-        postChunk = [(i[0] - screen_l_x, i[1]) for i in self.postChunk]
+        else:
+            if startx in self.prefetched:
+                self.prefetch_hits += 1
+                self.prefetched.discard(startx)
+
+            self.chunks.move_to_end(startx)
+
+        return chunk
+
+    def add_chunk(self, startx, chunk):
+        "stores chunk in cache, evicting least recently used chunks over the cap"
+
+        self.chunks[startx] = chunk
+
+        while len(self.chunks) > self.max_chunks:
+            evicted_startx, evicted_chunk = self.chunks.popitem(last=False)
+            self.prefetched.discard(evicted_startx)
+            self.evicted += 1
+
+    def prefetch(self, screen_l_x, velocity_x):
+        '''predicts where the screen will be from the craft's horizontal
+        velocity and starts generating the chunks it will need in the background'''
+
+        width = self.chunk_width
+
+        # collect finished chunks, only ever on the main thread
+        for startx, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[startx]
+                chunk = future.result()
+                self.add_chunk(startx, chunk)
+                self.prefetched.add(startx)
+
+        # limit look ahead so a very fast craft doesn't queue a long way ahead
+        ahead = velocity_x * self.prefetch_frames
+        ahead = max(-2*width, min(2*width, ahead))
+
+        first = int(round(min(screen_l_x, screen_l_x+ahead) / width)) - self.prefetch_margin
+        last = int(round(max(screen_l_x, screen_l_x+ahead) / width)) + self.prefetch_margin
+
+        # nearest first, the worker generates them in the order they're queued
+        middle = round(screen_l_x / width)
+        for index in sorted(range(first, last+1), key=lambda index: abs(index - middle)):
+            startx = index * width
+
+            if startx in self.chunks or startx in self.pending:
+                continue
+
+            self.pending[startx] = self.executor.submit(
+                self.gen_chunk, startx, startx+width+self.spacing)
+
+    def chunk_counts(self):
+        "returns number of chunks loaded and number evicted so far"
+        return len(self.chunks), self.evicted
+
+    def prefetch_counts(self):
+        "returns number of chunks that were prefetched in time and number that weren't"
+        return self.prefetch_hits, self.prefetch_misses
+
+    def chunk_surface(self, chunk):
+        '''returns surface with chunk drawn on it and the world position of its
+        top left, the chunk is only drawn the first time'''
 
-        return preChunk, midChunk, postChunk
+        if chunk.surface is None:
+            margin = 2  # room for the line width either side
+
+            left = chunk.startx - margin
+            top = int(chunk.heights.min()) - margin
+            width = chunk.endx - left + margin + 1
+            height = int(chunk.heights.max()) - top + margin + 1
+
+            surface = pygame.Surface((width, height))
+            surface.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+
+            points = chunk.points(left)
+            points[:, 1] -= top
+            self.display(surface, points)
+
+            chunk.surface = (surface, (left, top))
+
+        return chunk.surface
 
     def draw_chunks(self, surface, screen_l_x):
-        "draw chunks on screen"
+        "draw chunks on screen by blitting their pre-drawn surfaces"
 
-        preChunk, midChunk, postChunk = self.convert_chunks(screen_l_x)
+        screen_l_x = int(screen_l_x)
 
-        self.display(surface, preChunk)
-        self.display(surface, midChunk)
-        self.display(surface, postChunk)
+        for chunk in (self.preChunk, self.midChunk, self.postChunk):
+            chunk_surface, (left, top) = self.chunk_surface(chunk)
+            surface.blit(chunk_surface, (left - screen_l_x, top))
 
     def get_terrain_y(self, x, screen_l_x):
+        "returns terrain y under screen x"
+        return self.height_at(int(x) + int(screen_l_x))
+
+    def height_at(self, x) -> float:
+        "returns terrain y at world x, generating the chunk there if needed"
 
-        preChunk, midChunk, postChunk = self.convert_chunks(screen_l_x)
+        startx = int(x // self.chunk_width) * self.chunk_width
 
-        y = 0
+        return self.get_chunk(startx).height_at(x)
 
-        # print(midChunk[0][0], midChunk[100][0], x)
+    def heights_at(self, x) -> np.ndarray:
+        "returns terrain y for an array of world x values in one call"
 
-        if x in range(int(preChunk[0][0]), int(preChunk[100][0])+1):
-            y = self.interpolate_y(x, preChunk)
+        x = np.asarray(x, dtype=np.float64)
+        starts = (x // self.chunk_width).astype(np.int64) * self.chunk_width
 
-        if x in range(int(midChunk[0][0]), int(midChunk[100][0])+1):
-            y = self.interpolate_y(x, midChunk)
+        if starts.min() == starts.max():
+            return self.get_chunk(int(starts.flat[0])).heights_at(x)
 
-        if x in range(int(postChunk[0][0]), int(postChunk[100][0])+1):
-            y = self.interpolate_y(x, postChunk)
+        y = np.empty(x.shape, dtype=np.float64)
+
+        # usually every x falls in one or two chunks
+        for startx in np.unique(starts).tolist():
+            in_chunk = starts == startx
+            y[in_chunk] = self.get_chunk(startx).heights_at(x[in_chunk])
 
         return y
 
-    def interpolate_y(self, x, chunk):
-        x = int(x)
-        for index, coord in enumerate(chunk):
-            if chunk[index][0] <= x and chunk[index+1][0] >= x:
-                sx = int(chunk[index][0])
-                sy = int(chunk[index][1])
-                ex = int(chunk[index+1][0])
-                ey = int(chunk[index+1][1])
-                y = sy + ((x-sx)/(ex-sx)) * (ey-sy)
-                return y
+    def sample_xs(self, low_x, high_x) -> np.ndarray:
+        '''returns the sorted world x values between low_x and high_x the
+        terrain changes slope at, the samples of each chunk up to where the
+        next chunk starts'''
+
+        width = self.chunk_width
+        spacing = self.spacing
+        samples_in_chunk = -(-width // spacing)  # samples before the next chunk's start
+
+        xs = []
+
+        for startx in range(int(low_x // width) * width, int(high_x // width) * width + 1, width):
+            first = max(-int(-(low_x - startx) // spacing), 0)  # round up
+            last = min(int((high_x - startx) // spacing), samples_in_chunk - 1)
+
+            xs.append(startx + spacing*np.arange(first, last+1))
+
+            # when the next chunk's start isn't one of this chunk's samples the
+            # two chunks' lines needn't meet there, so the ground steps and
+            # the point just before the step is needed too
+            end = startx + width
+            if width % spacing and low_x < end <= high_x:
+                xs.append(np.array([end - 1e-6]))
+
+        return np.concatenate(xs)
+
+    def min_height(self, low_x, high_x) -> int:
+        '''returns smallest terrain y (the highest ground) of the samples between
+        world x values and the samples either side of them'''
+
+        width = self.chunk_width
+        spacing = self.spacing
+
+        lowest = None
+
+        for startx in range(int(low_x // width) * width, int(high_x // width) * width + 1, width):
+            chunk = self.get_chunk(startx)
+
+            # sample indices are relative to the chunk's start, which needn't
+            # be a multiple of spacing
+            start = max(int((low_x - startx) // spacing), 0)
+            end = min(-int(-(min(high_x, startx + width) - startx) // spacing), len(chunk) - 1)
+            height = int(chunk.heights[start:end+1].min())
+
+            if lowest is None or height < lowest:
+                lowest = height
+
+        return lowest
+
+    def sweep_contact(self, points, start, end):
+        '''moves points, an (n, 2) array relative to an origin, in a straight
+        line as the origin goes from start to end in world space
+
+        returns (t, x, y) of the first point to touch the terrain, where t is
+        the fraction of the move it happened at, None if nothing touches'''
+
+        points = np.asarray(points, dtype=np.float64)
+        dx = end[0] - start[0]
+        dy = end[1] - start[1]
+
+        x0 = points[:, 0] + start[0]
+        y0 = points[:, 1] + start[1]
+
+        # most of the time the craft is well clear of the ground, and when it
+        # isn't only its lower points can reach it
+        low_x, high_x = x0.min() + min(dx, 0), x0.max() + max(dx, 0)
+        reach = y0 + max(dy, 0) >= self.min_height(low_x, high_x)
+        if not reach.any():
+            return None
+
+        x0 = x0[reach]
+        y0 = y0[reach]
+
+        # the terrain only changes slope at sample x values, so between the
+        # times a point passes one the gap to the terrain changes linearly
+        if dx == 0:
+            times = np.zeros((len(x0), 1))
+        else:
+            crossings = self.sample_xs(x0.min() + min(dx, 0), x0.max() + max(dx, 0))
+
+            # samples a point doesn't pass give times of 0 or 1, which are harmless
+            times = np.clip((crossings - x0[:, None]) / dx, 0, 1)
+            if dx < 0:
+                times = times[:, ::-1]  # crossings are passed right to left
+
+        times = np.hstack((np.zeros((len(x0), 1)), times, np.ones((len(x0), 1))))
+
+        x = x0[:, None] + times*dx
+        y = y0[:, None] + times*dy
+        gap = y - self.heights_at(x)  # >= 0 is touching or under the terrain
+
+        touching = gap >= 0
+        rows = np.flatnonzero(touching.any(axis=1))
+        if len(rows) == 0:
+            return None
+
+        # first touching time of each point that touches
+        step = np.argmax(touching[rows], axis=1)
+        t = times[rows, step]
+
+        # points that weren't touching at the start crossed in the step before
+        crossed = step > 0
+        before = step[crossed] - 1
+        before_t = times[rows[crossed], before]
+        before_gap = gap[rows[crossed], before]
+        after_gap = gap[rows[crossed], step[crossed]]
+        t[crossed] = before_t + (t[crossed] - before_t) * \
+            (-before_gap / (after_gap - before_gap))
+
+        first_point = np.argmin(t)
+        row = rows[first_point]
+        t = float(t[first_point])
+
+        return t, float(x0[row] + t*dx), float(y0[row] + t*dy)
+
+
+def benchmark_gen_chunk(terrain, repeats=200):
+    "times gen_chunk against gen_chunk_scalar, returns ms per chunk for each"
+
+    results = []
+
+    for gen in (terrain.gen_chunk_scalar, terrain.gen_chunk):
+        start = time.perf_counter()
+
+        for i in range(repeats):
+            x = i * 1000
+            gen(x, x+1000+terrain.spacing)
+
+        results.append((time.perf_counter() - start) * 1000 / repeats)
+
+    return results
+
+
+def benchmark_sweep_contact(terrain, repeats=2000):
+    '''times sweep_contact for a 25 point outline moving 1.5 px across and
+    0.8 px down, returns us per check clear of the ground and over it'''
+
+    angles = np.linspace(0, 2*np.pi, 25, endpoint=False)
+    points = np.column_stack((15*np.cos(angles), 15*np.sin(angles)))
+
+    results = []
+
+    # lowest point 200 px above the ground, then level with it
+    for clearance in (200, 0):
+        starts = [(x, terrain.height_at(x) - 15 - clearance)
+                  for x in np.linspace(0, 5000, repeats).tolist()]
+
+        start = time.perf_counter()
+
+        for x, y in starts:
+            terrain.sweep_contact(points, (x, y), (x+1.5, y+0.8))
+
+        results.append((time.perf_counter() - start) * 1e6 / repeats)
+
+    return results
 
 
 # display chunk
@@ -224,7 +700,16 @@ if __name__ == "__main__":
     t = Terrain(map_data_folder)
     t.set_seed(9007195)
 
-    x = 0
+    # python terrain.py --benchmark times chunk generation and collision instead
+    if sys.argv[1:] == ["--benchmark"]:
+        scalar_ms, vector_ms = benchmark_gen_chunk(t)
+        print(f"gen_chunk_scalar {scalar_ms:.3f} ms, gen_chunk {vector_ms:.3f} ms")
+
+        clear_us, ground_us = benchmark_sweep_contact(t)
+        print(f"sweep_contact {clear_us:.1f} us clear of the ground, {ground_us:.1f} us over it")
+
+    else:
+        x = 0
 
-    chunk = t.gen_chunk(x, x+1000)
-    t.plot_chunk(chunk)
+        chunk = t.gen_chunk(x, x+1000)
+        t.plot_chunk(chunk)
@@ -0,0 +1,27 @@
+'''fixtures shared by the tests, run them with python -m pytest from the
+repo root'''
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# nothing is shown or played
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+
+@pytest.fixture(scope="session")
+def data_folder() -> str:
+    return os.path.join(ROOT, "data")
+
+
+@pytest.fixture
+def terrain(data_folder):
+    from terrain import Terrain
+
+    terrain = Terrain(os.path.join(data_folder, "maps"))
+    terrain.set_seed(9007195)
+
+    return terrain
@@ -0,0 +1,24 @@
+import time
+from profiler import FrameProfiler
+
+
+def test_inner_section_is_taken_out_of_outer():
+    profiler = FrameProfiler(("collision", "terrain"), enabled=True)
+
+    with profiler.time("collision"):
+        time.sleep(0.01)
+
+        with profiler.time("terrain"):
+            time.sleep(0.03)
+
+            with profiler.time("terrain"):
+                time.sleep(0.01)
+
+        time.sleep(0.01)
+
+    profiler.end_frame()
+    collision, terrain, frame = profiler.samples[-1]
+
+    assert 20 <= collision < 40  # 60 if terrain weren't taken out
+    assert 40 <= terrain < 50  # 50 if the inner terrain counted twice
+    assert frame >= collision + terrain
@@ -0,0 +1,76 @@
+import os
+import random
+import pytest
+from recording import Recording, read_varint, write_varint
+from simulation import Simulation, random_inputs
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2**14, 2**32 - 1, 2**63])
+def test_varint_round_trip(value):
+    out = bytearray()
+    write_varint(out, value)
+
+    assert read_varint(out, 0) == (value, len(out))
+
+
+def test_recording_round_trip():
+    recording = Recording(2**32 - 1, "moon", "défiant")
+
+    # long runs take several varint bytes, every input bitmask is used
+    for bits, steps in ((0, 1), (1, 200), (3, 70000), (7, 1), (0, 2**20), (5, 3)):
+        for i in range(steps):
+            recording.record(bits)
+
+    recording.finish(120, [-2370, 0, 480, -1, 2**40, -2**40])
+
+    copy = Recording.from_bytes(recording.to_bytes())
+
+    assert copy == recording
+    assert list(copy.inputs()) == list(recording.inputs())
+
+
+def test_truncated_recording_is_rejected():
+    recording = Recording(1, "moon", "eagle")
+    for bits in (1, 2, 4):
+        recording.record(bits)
+
+    data = recording.to_bytes()
+
+    with pytest.raises(ValueError):
+        Recording.from_bytes(b"XYZ" + data[3:])
+
+    with pytest.raises((ValueError, IndexError)):
+        Recording.from_bytes(data[:-1])
+
+
+def test_replay_flies_the_same(data_folder):
+    craft_folder = os.path.join(data_folder, "spacecraft")
+    map_folder = os.path.join(data_folder, "maps")
+
+    simulation = Simulation(craft_folder, map_folder)
+    replayer = Simulation(craft_folder, map_folder)
+
+    rng = random.Random(3)
+    landings = 0
+
+    for i in range(30):
+        seed = simulation.reset(rng.randint(1, 1000000))
+        recording = Recording(seed, simulation.terrain.get_map(), simulation.spacecraft.craft_name)
+
+        for bits in random_inputs(5000, rng):
+            recording.record(bits)
+            if simulation.step(bits) != "main_game":
+                break
+
+        result = simulation.result()
+        recording.finish(result["score"], result["landed"])
+
+        replayed = replayer.replay(Recording.from_bytes(recording.to_bytes()))
+
+        assert replayed == result
+        assert replayed["score"] == recording.score
+        assert replayed["landed"] == recording.landed
+
+        landings += bool(result["landed"])
+
+    assert landings > 0  # landed pads are covered too
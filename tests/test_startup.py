@@ -0,0 +1,53 @@
+import sys
+import subprocess
+from conftest import ROOT
+
+
+# seconds importing main, and so every game module, may take
+IMPORT_TIME_CAP = 0.6
+
+
+def run(code, *options):
+    "runs code in a fresh interpreter in the repo root, returns the finished process"
+
+    return subprocess.run([sys.executable, *options, "-c", code], cwd=ROOT,
+                          capture_output=True, text=True)
+
+
+def import_time(module, runs=3):
+    '''returns the fewest seconds importing module took over runs fresh
+    interpreters, and the slowest imports of that run as (seconds, name)'''
+
+    best = None
+
+    for i in range(runs):
+        process = run(f"import {module}", "-X", "importtime")
+        assert process.returncode == 0, process.stderr
+
+        # lines look like "import time: self [us] | cumulative | imported package"
+        imports = []
+        for line in process.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[1].strip().isdigit():
+                imports.append((int(fields[1]) / 1e6, fields[2].rstrip()))
+
+        total = next(seconds for seconds, name in imports if name.strip() == module)
+
+        if best is None or total < best[0]:
+            best = (total, sorted(imports, reverse=True)[1:6])
+
+    return best
+
+
+def test_import_time():
+    total, slowest = import_time("main")
+
+    assert total <= IMPORT_TIME_CAP, f"import main took {total:.3f} s, slowest: {slowest}"
+
+
+def test_import_has_no_side_effects():
+    process = run("import sys, main, utils, terrain, pygame\n"
+                  "print(pygame.get_init(), 'matplotlib' in sys.modules)")
+
+    assert process.returncode == 0, process.stderr
+    assert process.stdout.split()[-2:] == ["False", "False"]
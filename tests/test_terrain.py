@@ -0,0 +1,123 @@
+import os
+import random
+import numpy as np
+import pytest
+from terrain import Terrain
+
+
+def test_evicted_chunks_regenerate_the_same(data_folder):
+    terrain = Terrain(os.path.join(data_folder, "maps"), max_chunks=3)
+    terrain.set_seed(9007195)
+
+    terrain.update(0)
+    chunk = terrain.midChunk
+    pads = [list(pad) for pad in chunk.pads]
+
+    for x in range(0, 20000, 100):
+        terrain.update(x)
+    for x in range(20000, -1, -100):
+        terrain.update(x)
+
+    assert terrain.chunk_counts()[0] == 3
+    assert terrain.chunk_counts()[1] > 0
+    assert terrain.midChunk is not chunk
+    assert terrain.midChunk == chunk
+    assert terrain.midChunk.pads == pads
+
+
+def test_chunks_independent_of_generation_order(terrain):
+    starts = list(range(-20*terrain.chunk_width, 20*terrain.chunk_width, terrain.chunk_width))
+
+    def generate(order):
+        return {startx: terrain.gen_chunk(startx, startx+terrain.chunk_width+terrain.spacing)
+                for startx in order}
+
+    sequential = generate(starts)
+
+    shuffled = list(starts)
+    random.Random(1).shuffle(shuffled)
+
+    assert generate(shuffled) == sequential
+    assert generate(reversed(starts)) == sequential
+
+
+def test_gen_chunk_matches_gen_chunk_scalar(terrain):
+    for startx in range(-10*terrain.chunk_width, 10*terrain.chunk_width, terrain.chunk_width):
+        endx = startx+terrain.chunk_width+terrain.spacing
+
+        assert terrain.gen_chunk(startx, endx) == terrain.gen_chunk_scalar(startx, endx)
+
+
+def brute_force_contact(terrain, points, start, end, steps=10000):
+    "returns the first of steps+1 evenly spaced times any point is on or under the terrain"
+
+    times = np.linspace(0, 1, steps+1)[:, None]
+    x = points[:, 0] + start[0] + times*(end[0]-start[0])
+    y = points[:, 1] + start[1] + times*(end[1]-start[1])
+
+    touching = (y >= terrain.heights_at(x)).any(axis=1)
+    if not touching.any():
+        return None
+
+    return float(times[np.argmax(touching), 0])
+
+
+def set_spacing(terrain, spacing):
+    "switches terrain to samples spacing apart, dropping chunks made with the old spacing"
+
+    terrain.spacing = spacing
+    terrain.set_seed(terrain.seed)
+
+
+# 7 and 30 don't divide the chunk width, so samples aren't at multiples of spacing
+@pytest.mark.parametrize("spacing", [10, 7, 30])
+def test_min_height_bounds_the_ground(terrain, spacing):
+    set_spacing(terrain, spacing)
+    rng = np.random.default_rng(2)
+
+    for i in range(300):
+        low_x = rng.uniform(-3000, 3000)
+        high_x = low_x + rng.uniform(0, 100)
+
+        ground = terrain.heights_at(np.linspace(low_x, high_x, 1001))
+
+        # samples of the chunks under the range within a spacing of it
+        around = []
+        width = terrain.chunk_width
+        for startx in range(int(low_x // width) * width, int(high_x // width) * width + 1, width):
+            chunk = terrain.get_chunk(startx)
+            xs = chunk.startx + chunk.spacing*np.arange(len(chunk))
+            around.append(chunk.heights[(xs >= low_x - spacing) & (xs <= high_x + spacing)])
+
+        assert np.concatenate(around).min() <= terrain.min_height(low_x, high_x) <= ground.min() + 1e-9
+
+
+@pytest.mark.parametrize("spacing", [10, 7, 30])
+def test_sweep_contact_matches_brute_force(terrain, spacing):
+    set_spacing(terrain, spacing)
+    rng = np.random.default_rng(1)
+
+    angles = np.linspace(0, 2*np.pi, 25, endpoint=False)
+    points = np.column_stack((15*np.cos(angles), 15*np.sin(angles)))
+
+    contacts = 0
+
+    for i in range(100):
+        x = rng.uniform(-3000, 3000)
+        y = terrain.height_at(x) - 15 - rng.uniform(0, 30)
+
+        # every third move is straight down
+        dx = 0 if i % 3 == 0 else rng.uniform(-40, 40)
+        end = (x + dx, y + rng.uniform(0, 40))
+
+        contact = terrain.sweep_contact(points, (x, y), end)
+        expected = brute_force_contact(terrain, points, (x, y), end)
+
+        if expected is None:
+            assert contact is None
+        else:
+            contacts += 1
+            assert contact is not None
+            assert abs(contact[0] - expected) <= 1e-4
+
+    assert contacts > 15  # both outcomes are covered
@@ -2,7 +2,7 @@
 import pygame
 import time
 import pygame as pg
-pg.init()
+from collections import OrderedDict
 
 
 def resize_image(image, sf):
@@ -15,20 +15,272 @@ def resize_image(image, sf):
     return image
 
 
+# colour for transparent pixels of images converted to use a colorkey
+TRANSPARENT_KEY = (255, 0, 255)
+
+
+def display_format(image):
+    '''returns image converted to the display's pixel format for faster blits,
+    images whose pixels are all either clear or solid use a colorkey with RLE
+    acceleration instead of per pixel alpha. Without a display the image is
+    returned as it is'''
+
+    if pygame.display.get_surface() is None:
+        return image
+
+    if not image.get_flags() & pygame.SRCALPHA:
+        colorkey = image.get_colorkey()
+        image = image.convert()
+
+        if colorkey is not None:
+            image.set_colorkey(colorkey, pygame.RLEACCEL)
+
+        return image
+
+    solid = pygame.mask.from_surface(image, 254)
+    visible = pygame.mask.from_surface(image, 0)
+
+    if solid.count() != visible.count():
+        return image.convert_alpha()  # partly see through pixels
+
+    key_coloured = pygame.mask.from_threshold(
+        image, TRANSPARENT_KEY + (255,), (1, 1, 1, 255))
+    if solid.overlap(key_coloured, (0, 0)):
+        return image.convert_alpha()  # key colour is used by a solid pixel
+
+    keyed = pygame.Surface(image.get_size()).convert()
+    keyed.fill(TRANSPARENT_KEY)
+    keyed.blit(image, (0, 0))
+    keyed.set_colorkey(TRANSPARENT_KEY, pygame.RLEACCEL)
+
+    return keyed
+
+
+class LRUCache(OrderedDict):
+    "dictionary holding at most max_size items, least recently used are dropped first"
+
+    def __init__(self, max_size):
+        super().__init__()
+        self.max_size = max_size
+
+    def get(self, key, default=None):
+        if key in self:
+            self.move_to_end(key)
+            return self[key]
+        return default
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+
+        while len(self) > self.max_size:
+            self.popitem(last=False)
+
+
+class DirtyRects():
+    '''Collects the parts of the screen that changed since the last display
+    update, so static screens only send those to the display'''
+
+    def __init__(self):
+        self.rects = []
+        self.everything = False
+
+        # (surface id, pos) -> (source, rect) blitted there last time
+        self.shown = {}
+
+    def add(self, rect):
+        self.rects.append(pygame.Rect(rect))
+
+    def add_all(self):
+        "marks the whole screen as changed, e.g. when a different screen is shown"
+        self.everything = True
+
+        # what an earlier screen left at a position says nothing about this one
+        self.shown.clear()
+
+    def blit(self, surface, source, pos):
+        '''blits source to surface at pos, marking the area changed if
+        something else was blitted there last time'''
+
+        rect = surface.blit(source, pos)
+
+        key = (id(surface), tuple(pos))
+        last = self.shown.get(key)
+
+        if last is None or last[0] is not source:
+            self.rects.append(rect)
+            if last is not None:
+                self.rects.append(last[1])  # whatever was there before is gone
+
+            self.shown[key] = (source, rect)
+
+        return rect
+
+    def changed(self) -> bool:
+        return self.everything or bool(self.rects)
+
+    def update(self):
+        "sends the changed parts of the screen to the display"
+
+        if self.everything:
+            pygame.display.flip()
+        elif self.rects:
+            pygame.display.update(self.rects)
+
+        self.rects = []
+        self.everything = False
+
+
+dirty = DirtyRects()
+
+
+# rendered text surfaces keyed by (font, text, antialias, color)
+text_cache = LRUCache(256)
+
+
+def render_text(font, text, antialias, color):
+    '''same as font.render, but a surface is only rendered the first time
+    text is asked for while it is in the cache'''
+
+    key = (font, text, antialias, tuple(color))
+
+    surface = text_cache.get(key)
+    if surface is None:
+        surface = font.render(text, antialias, color)
+        text_cache[key] = surface
+
+    return surface
+
+
+class Assets():
+    '''Loads each image and sound file once and hands out shared references,
+    images are converted to the display format unless asked not to be.
+
+    Surfaces handed out are shared, so they mustn't be drawn on'''
+
+    def __init__(self):
+        self.files = {}  # path -> image as loaded
+        self.images = {}  # (path, scale, colorkey, convert) -> image
+        self.sounds = {}  # path -> Sound
+
+    def load(self, path):
+        "returns image at path as loaded from disk"
+
+        image = self.files.get(path)
+        if image is None:
+            image = pygame.image.load(path)
+            self.files[path] = image
+
+        return image
+
+    def image(self, path, scale=1, colorkey=None, convert=True):
+        "returns image at path resized by scale, with colorkey set if given"
+
+        key = (path, scale, colorkey, convert)
+
+        image = self.images.get(key)
+        if image is None:
+            image = self.load(path)
+
+            if scale != 1:
+                image = resize_image(image, scale)
+
+            if colorkey is not None:
+                if image is self.files[path]:
+                    image = image.copy()
+                image.set_colorkey(colorkey)
+
+            if convert:
+                image = display_format(image)
+
+            self.images[key] = image
+
+        return image
+
+    def sound(self, path):
+        "returns Sound loaded from path"
+
+        sound = self.sounds.get(path)
+        if sound is None:
+            sound = pygame.mixer.Sound(path)
+            self.sounds[path] = sound
+
+        return sound
+
+
+assets = Assets()
+
+
 def get_price(craftList, craft):
     for element in craftList:
         if element[0] == craft:
             return element[1]
 
 
-class Button():
-    def __init__(self, x, y, image_path, hover_path, scale, sound_path=r"data\sounds\button_click.wav"):
-        image = pygame.image.load(image_path)
+# seconds between a button being pressed and what it does happening, so the
+# press can be seen and heard
+CLICK_DELAY = 0.1
+
+
+class ClickInput():
+    '''Turns left mouse button presses from the event queue into button
+    clicks, each press clicks at most one button, once.
+
+    A pressed button clicks delay seconds after the press, with its time
+    kept here rather than waited out, and presses while one is waiting
+    are ignored.'''
+
+    def __init__(self, delay=CLICK_DELAY):
+        self.delay = delay
 
-        hover_image = pygame.image.load(hover_path)
+        self.press = None  # mouse position of a press this frame no button has taken
+        self.pending = None  # (button, time) of the press waiting to click
 
-        self.image_norm = resize_image(image, scale)
-        self.hover_image = resize_image(hover_image, scale)
+    def handle_events(self, events):
+        "takes this frame's events, call once a frame before buttons are drawn"
+
+        self.press = None
+
+        # the button wasn't drawn again to take its click, e.g. its screen was left by a key
+        if self.pending is not None and time.perf_counter() - self.pending[1] > self.delay + 1:
+            self.pending = None
+
+        for event in events:
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and self.pending is None:
+                self.press = event.pos
+
+    def take_press(self, button) -> bool:
+        "returns True if this frame's press was on button, which then waits to click"
+
+        if self.press is None or not button.rect.collidepoint(self.press):
+            return False
+
+        self.press = None
+        self.pending = (button, time.perf_counter())
+
+        return True
+
+    def is_pressed(self, button) -> bool:
+        return self.pending is not None and self.pending[0] is button
+
+    def take_click(self, button) -> bool:
+        "returns True once button's press has waited delay seconds"
+
+        if not self.is_pressed(button) or time.perf_counter() - self.pending[1] < self.delay:
+            return False
+
+        self.pending = None
+
+        return True
+
+
+clicks = ClickInput()
+
+
+class Button():
+    def __init__(self, x, y, image_path, hover_path, scale, sound_path=r"data\sounds\button_click.wav"):
+        self.image_norm = assets.image(image_path, scale)
+        self.hover_image = assets.image(hover_path, scale)
 
         self.image = self.image_norm
 
@@ -36,35 +288,31 @@ class Button():
         self.rect.topleft = (x, y)
         self.clicked = False
 
-        self.click_sound = pygame.mixer.Sound(sound_path)
+        self.click_sound = assets.sound(sound_path)
 
     def draw(self, surface):
         """Displays button on screen, records if it is clicked"""
         pos = pygame.mouse.get_pos()  # mouse position
 
-        self.image = self.image_norm
+        if clicks.take_press(self):
+            pygame.mixer.Sound.play(self.click_sound)
 
-        self.clicked = False
-        if self.rect.collidepoint(pos):
+        # True on the one frame the click happens
+        self.clicked = clicks.take_click(self)
 
+        if self.rect.collidepoint(pos) or clicks.is_pressed(self):
             self.image = self.hover_image
+        else:
+            self.image = self.image_norm
 
-            if pygame.mouse.get_pressed()[0] == 1 and self.clicked == False:
-
-                self.clicked = True
-                pygame.mixer.Sound.play(self.click_sound)
-                time.sleep(0.1)  # small delay so program doesn't feel too fast
-        if pygame.mouse.get_pressed()[0] == 0:
-            self.clicked = False
-
-        surface.blit(self.image, (self.rect.x, self.rect.y))
+        dirty.blit(surface, self.image, (self.rect.x, self.rect.y))
 
         return
 
 
 COLOR_INACTIVE = pg.Color('lightskyblue3')
 COLOR_ACTIVE = pg.Color('white')
-FONT = pg.font.Font(None, 32)
+FONT_SIZE = 32
 
 
 class InputBox:
@@ -73,9 +321,11 @@ class InputBox:
         self.rect = pg.Rect(x, y, w, h)
         self.color = COLOR_INACTIVE
         self.text = text
-        self.txt_surface = FONT.render(text, True, self.color)
+        self.font = pg.font.Font(None, FONT_SIZE)
+        self.txt_surface = self.font.render(text, True, self.color)
         self.active = False
         self.enter = False
+        self.drawn_box = None  # (color, rect) of the border last drawn
 
     def handle_event(self, event):
         final_text = False
@@ -98,7 +348,7 @@ class InputBox:
                 else:
                     self.text += event.unicode
                 # Re-render the text.
-                self.txt_surface = FONT.render(self.text, True, self.color)
+                self.txt_surface = self.font.render(self.text, True, self.color)
 
         return final_text
 
@@ -109,6 +359,14 @@ class InputBox:
 
     def draw(self, screen):
         # Blit the text.
-        screen.blit(self.txt_surface, (self.rect.x+5, self.rect.y+5))
+        dirty.blit(screen, self.txt_surface, (self.rect.x+5, self.rect.y+5))
         # Blit the rect.
-        pg.draw.rect(screen, self.color, self.rect, 2)
+        rect = pg.draw.rect(screen, self.color, self.rect, 2)
+
+        box = (tuple(self.color), tuple(rect))
+        if box != self.drawn_box:
+            dirty.add(rect)
+            if self.drawn_box is not None:
+                dirty.add(self.drawn_box[1])
+
+            self.drawn_box = box
@@ -0,0 +1,90 @@
+'''Checks recorded flights by flying them again headless, spread over a pool
+of processes, so a backlog of score submissions can be checked at once.'''
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from recording import Recording
+from simulation import Simulation
+
+
+simulation = None  # one per worker process, set up by init_worker
+
+
+def init_worker(craft_folder, map_folder):
+    "loads a headless simulation once in each worker process"
+    global simulation
+
+    simulation = Simulation(craft_folder, map_folder)
+
+
+def verify(path) -> dict:
+    '''replays the recording at path, it is verified if the replay uses every
+    recorded step and ends with the score and pads the game reported'''
+
+    try:
+        recording = Recording.load(path)
+    except (OSError, ValueError) as error:
+        return {"path": path, "verified": False, "reason": str(error)}
+
+    result = simulation.replay(recording)
+
+    if result["steps"] != recording.steps:
+        reason = f"crashed after {result['steps']} of {recording.steps} steps"
+    elif result["score"] != recording.score:
+        reason = f"score {recording.score} reported, {result['score']} replayed"
+    elif result["landed"] != recording.landed:
+        reason = "landed pads don't match"
+    else:
+        reason = None
+
+    return {
+        "path": path,
+        "verified": reason is None,
+        "reason": reason,
+        "score": result["score"],
+    }
+
+
+def verify_all(paths, craft_folder, map_folder, workers=None) -> list:
+    "verifies recordings using every core (or workers processes), returns results in order"
+
+    with ProcessPoolExecutor(workers, initializer=init_worker,
+                             initargs=(craft_folder, map_folder)) as executor:
+        chunksize = max(1, len(paths) // ((workers or os.cpu_count()) * 4))
+
+        return list(executor.map(verify, paths, chunksize=chunksize))
+
+
+def recording_paths(paths) -> list:
+    "expands folders in paths to the recordings in them"
+
+    found = []
+
+    for path in paths:
+        if os.path.isdir(path):
+            found += sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.endswith(".llr"))
+        else:
+            found.append(path)
+
+    return found
+
+
+if __name__ == "__main__":
+
+    # python verification.py [recordings or folders], defaults to data/recordings
+    paths = recording_paths(sys.argv[1:] or [os.path.join("data", "recordings")])
+
+    start = time.perf_counter()
+    results = verify_all(paths, os.path.join('data', 'spacecraft'),
+                         os.path.join("data", "maps"))
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        if not result["verified"]:
+            print(f"FAILED {result['path']}: {result['reason']}")
+
+    verified = sum(result["verified"] for result in results)
+    print(f"{verified} of {len(results)} runs verified in {elapsed:.2f} s, "
+          f"{len(results) / elapsed:.1f} runs/s on {os.cpu_count()} cores")